@@ -0,0 +1,197 @@
+"""
+Answers many degrees-of-separation queries in one run.
+
+Each input line holds a pair of people, either as a JSON object
+{"source": ..., "target": ...} or as two tab- or comma-separated
+fields. A person may be given by IMDb id or by name; JSON objects may
+also carry "source_birth" and "target_birth" to tell apart people who
+share a name. Results are written as one JSON object per line, in
+input order.
+
+Queries are grouped by source so that one breadth-first tree from each
+source answers all of its targets, and the data is loaded only once.
+With --workers, groups are searched in parallel by a QueryPool; add
+--unordered to write each group's results as soon as they are ready.
+
+Usage: python batch.py [directory] [--input FILE] [--output FILE]
+                       [--compact] [--workers N] [--unordered] [--fuzzy N]
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import degrees
+from parallel import QueryPool
+from snapshot import load_graph
+
+
+def parse_pair(line):
+    """
+    Returns (source, target, source_birth, target_birth) for an input
+    line, or None for blank lines. Births are None unless given.
+    Raises ValueError if the line is not a pair.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        record = json.loads(line)
+        try:
+            return (str(record["source"]), str(record["target"]),
+                    record.get("source_birth"), record.get("target_birth"))
+        except (AttributeError, KeyError, TypeError):
+            raise ValueError("expected 'source' and 'target' keys")
+    delimiter = "\t" if "\t" in line else ","
+    fields = [field.strip() for field in next(csv.reader([line],
+                                                         delimiter=delimiter))]
+    if len(fields) != 2:
+        raise ValueError(f"expected 2 fields, found {len(fields)}")
+    return fields[0], fields[1], None, None
+
+
+def is_person_id(text, graph=None):
+    if graph is not None:
+        try:
+            graph.index_of(text)
+        except KeyError:
+            return False
+        return True
+    return text in degrees.people
+
+
+def resolve(text, graph=None, birth=None, max_distance=0):
+    """
+    Returns the person_id for an IMDb id or a name, never prompting:
+    see degrees.find_person_id. Raises ValueError if nobody matches.
+    """
+    if is_person_id(text, graph):
+        return text
+    person_id = degrees.find_person_id(text, birth, max_distance, graph)
+    if person_id is None:
+        raise ValueError(f"person not found: {text}")
+    return person_id
+
+
+def read_queries(lines, graph=None, max_distance=0):
+    """
+    Parses and resolves every query in lines.
+
+    Returns the list of result dicts in input order, and a dict mapping
+    each source person_id to the results that share it.
+    """
+    results = []
+    by_source = {}
+    for number, line in enumerate(lines, 1):
+        result = {"line": number}
+        try:
+            pair = parse_pair(line)
+            if pair is None:
+                continue
+            result["source"], result["target"] = pair[:2]
+            result["source_id"] = resolve(pair[0], graph, pair[2],
+                                          max_distance)
+            result["target_id"] = resolve(pair[1], graph, pair[3],
+                                          max_distance)
+        except ValueError as e:
+            result["error"] = str(e)
+        else:
+            by_source.setdefault(result["source_id"], []).append(result)
+        results.append(result)
+    return results, by_source
+
+
+def fill(queries, paths):
+    """
+    Records the path found for each query's target in its result dict.
+    """
+    for query in queries:
+        path = paths[query["target_id"]]
+        query["degrees"] = None if path is None else len(path)
+        query["path"] = None if path is None else [list(step)
+                                                  for step in path]
+
+
+def answer_queries(lines, graph=None, pool=None, ordered=True,
+                   max_distance=0):
+    """
+    Yields one result dict per query in lines.
+
+    Results come in input order unless a pool is given and ordered is
+    False, in which case parse errors come first and then each group of
+    queries sharing a source as soon as its search finishes.
+    """
+    results, by_source = read_queries(lines, graph, max_distance)
+    groups = [(source, {query["target_id"] for query in queries})
+              for source, queries in by_source.items()]
+
+    if pool is None:
+        for source, targets in groups:
+            fill(by_source[source],
+                 degrees.shortest_paths(source, targets, graph))
+        yield from results
+    elif ordered:
+        futures = {source: pool.submit(source, targets)
+                   for source, targets in groups}
+        for result in results:
+            if "source_id" in result and "degrees" not in result:
+                source, paths = futures[result["source_id"]].result()
+                fill(by_source[source], paths)
+            yield result
+    else:
+        for result in results:
+            if "error" in result:
+                yield result
+        for source, paths in pool.map(groups, ordered=False):
+            fill(by_source[source], paths)
+            yield from by_source[source]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", default="-",
+                        help="file of pairs, one per line (default stdin)")
+    parser.add_argument("--output", default="-",
+                        help="JSONL file for the results (default stdout)")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into an integer-indexed graph")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (0 for one per CPU)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write results as they finish, not in input "
+                             "order")
+    parser.add_argument("--fuzzy", type=int, default=0, metavar="N",
+                        help="match names within N typos if no name is "
+                             "exact")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = None
+    pool = None
+    if args.workers != 1:
+        pool = QueryPool(args.directory, args.compact, args.workers or None)
+        graph = pool.graph
+    elif args.compact:
+        graph = load_graph(args.directory)
+    else:
+        degrees.load_data(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    source = sys.stdin if args.input == "-" else open(args.input,
+                                                      encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w",
+                                                        encoding="utf-8")
+    with source, output:
+        for result in answer_queries(source, graph, pool,
+                                     not args.unordered, args.fuzzy):
+            output.write(json.dumps(result) + "\n")
+    if pool is not None:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
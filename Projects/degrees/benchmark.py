@@ -0,0 +1,163 @@
+"""
+Compares the breadth-first searches in degrees.py against the original
+explored-paths search kept in legacy.py, and the dict-of-sets layout
+against the CompactGraph layout and its snapshot.
+
+Usage: python benchmark.py [directory ...] [--pairs N] [--skip-legacy]
+                           [--memory] [--landmarks K]
+"""
+
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+import degrees
+import legacy
+import snapshot
+from graph import CompactGraph
+from landmarks import LandmarkOracle
+
+
+def sample_pairs(count, seed=0):
+    """
+    Returns count (source, target) pairs of person_ids drawn from
+    people who starred in at least one movie.
+    """
+    rng = random.Random(seed)
+    candidates = sorted(
+        person_id for person_id, person in degrees.people.items()
+        if person["movies"]
+    )
+    return [(rng.choice(candidates), rng.choice(candidates))
+            for _ in range(count)]
+
+
+def time_queries(search, pairs):
+    """
+    Runs search over every pair and returns (seconds, results).
+    """
+    results = []
+    start = time.perf_counter()
+    for source, target in pairs:
+        results.append(search(source, target))
+    return time.perf_counter() - start, results
+
+
+def measure_memory(load):
+    """
+    Runs load() under tracemalloc and returns (retained, peak) bytes.
+    """
+    tracemalloc.start()
+    result = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def load_dicts(directory, loader=degrees.load_data):
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+    loader(directory)
+    return degrees.people
+
+
+def report_memory(directory):
+    for name, load in [
+        ("dict layout", lambda: load_dicts(directory)),
+        ("legacy dicts", lambda: load_dicts(directory, legacy.load_data)),
+        ("compact", lambda: CompactGraph.from_csv(directory)),
+    ]:
+        start = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - start
+        retained, peak = measure_memory(load)
+        print(f"  {name + ':':<15}{elapsed:.2f}s, "
+              f"{retained / 2 ** 20:.1f} MiB retained, "
+              f"{peak / 2 ** 20:.1f} MiB peak")
+
+
+def length(path):
+    return None if path is None else len(path)
+
+
+def run(directory, pairs, skip_legacy, memory, landmarks):
+    if memory:
+        print(f"{directory}: load time and memory")
+        report_memory(directory)
+
+    start = time.perf_counter()
+    load_dicts(directory)
+    print(f"{directory}: loaded {len(degrees.people)} people and "
+          f"{len(degrees.movies)} movies in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    graph = CompactGraph.from_csv(directory)
+    print(f"{directory}: built compact graph in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    if snapshot.is_fresh(directory):
+        start = time.perf_counter()
+        snapshot.read_snapshot(snapshot.snapshot_path(directory))
+        print(f"{directory}: mapped snapshot in "
+              f"{(time.perf_counter() - start) * 1000:.2f}ms")
+
+    queries = sample_pairs(pairs)
+    searches = [
+        ("shortest_path", degrees.shortest_path),
+        ("bidirectional", degrees.bidirectional_shortest_path),
+        ("compact", lambda source, target:
+            degrees.shortest_path(source, target, graph)),
+        ("compact bidi", lambda source, target:
+            degrees.bidirectional_shortest_path(source, target, graph)),
+    ]
+    if landmarks:
+        start = time.perf_counter()
+        oracle = LandmarkOracle.build(graph, landmarks)
+        print(f"{directory}: built {len(oracle.landmarks)} landmarks in "
+              f"{time.perf_counter() - start:.2f}s")
+        searches.append(("landmarks", oracle.shortest_path))
+    if not skip_legacy:
+        searches.append(("legacy", legacy.shortest_path))
+
+    expected = None
+    for name, search in searches:
+        elapsed, results = time_queries(search, queries)
+        print(f"  {name + ':':<15}{elapsed:.4f}s for {len(queries)} queries "
+              f"({elapsed / len(queries) * 1000:.3f} ms/query)")
+        if expected is None:
+            expected = results
+            continue
+        mismatches = sum(
+            length(path) != length(other)
+            for path, other in zip(results, expected)
+        )
+        print(f"  {'':<15}mismatched lengths: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directories", nargs="*", default=["small", "large"])
+    parser.add_argument("--pairs", type=int, default=20)
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="do not time the original search")
+    parser.add_argument("--memory", action="store_true",
+                        help="report load time and memory of each layout")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="also time ALT search with K landmarks")
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            print(f"{directory}: not found, skipping")
+            continue
+        run(directory, args.pairs, args.skip_legacy, args.memory,
+            args.landmarks)
+
+
+if __name__ == "__main__":
+    main()
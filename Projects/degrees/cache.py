@@ -0,0 +1,232 @@
+"""
+Bounded LRU cache in front of degrees.shortest_path.
+
+Paths are cached per (source, target). Because co-starring is
+symmetric, a cached path also answers (target, source) once reversed.
+Sources that are queried often enough get their whole breadth-first
+tree cached, after which every target is answered from the tree.
+
+When a star edge is added to the data, invalidate_star drops only the
+entries that the new edge could make shorter.
+"""
+
+import sys
+from collections import OrderedDict
+
+import degrees
+
+# Rough per-item sizes, in bytes, used for the byte limit
+PATH_STEP_SIZE = sys.getsizeof((None, None))
+TREE_ENTRY_SIZE = sys.getsizeof((None, None)) + 2 * sys.getsizeof(0) + 32
+
+
+def reverse_path(source, path):
+    """
+    Returns the path from the last person of path back to source,
+    where path is a list of (movie_id, person_id) pairs from source.
+    """
+    if path is None:
+        return None
+    people = [source] + [person_id for _, person_id in path]
+    return [(path[i][0], people[i]) for i in range(len(path) - 1, -1, -1)]
+
+
+class PathCache():
+    """
+    LRU cache of shortest paths and breadth-first trees.
+
+    At most max_entries paths and trees are kept, and if max_bytes is
+    set, at most that many (estimated) bytes; a path or tree larger
+    than max_bytes on its own is not cached at all. A source gets its
+    tree cached once it has missed the cache hot_after times. Misses
+    are counted for the max_entries sources that missed most recently.
+    """
+
+    def __init__(self, graph=None, max_entries=10000, max_bytes=None,
+                 hot_after=8):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hot_after = hot_after
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.misses_by_source = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """Returns the counters of the cache as a dict."""
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.size = 0
+        self.misses_by_source.clear()
+
+    def invalidate_star(self, person_id, movie_id, budget=100000):
+        """
+        Drops the entries that a star edge, already added to the data,
+        could change, and returns how many were dropped.
+
+        The edge links person_id to the other stars of movie_id, so a
+        path can only get shorter by passing through two of them: a path
+        of length L from s to t goes stale if
+        d(s, stars) + 1 + d(stars, t) < L. A path survives if its ends
+        are both farther than (L - 2) / 2 from the stars, so one
+        breadth-first search from the stars out to half the longest
+        cached path is enough; entries it cannot decide are dropped. If
+        it visits more than budget people, the whole cache is cleared
+        instead. Cached None results and trees are always dropped.
+        """
+        longest = max((len(path) for key, path in self.entries.items()
+                       if key[0] == "path" and path is not None), default=0)
+        radius = max(longest - 2, 0) // 2
+        distances = self.distances_to_movie(movie_id, radius, budget)
+        if distances is None:
+            dropped = len(self.entries)
+            self.clear()
+            return dropped
+
+        if self.graph is not None:
+            distances = {self.graph.person_id_at(p): d
+                         for p, d in distances.items()}
+
+        def distance(person_id):
+            return distances.get(person_id, radius + 1)
+
+        stale = []
+        for key, value in self.entries.items():
+            if key[0] == "tree" or value is None:
+                stale.append(key)
+                continue
+            if distance(key[1]) + 1 + distance(key[2]) < len(value):
+                stale.append(key)
+        for key in stale:
+            del self.entries[key]
+            self.size -= self.sizes.pop(key)
+        return len(stale)
+
+    def distances_to_movie(self, movie_id, radius, budget):
+        """
+        Returns a dict mapping everyone within radius co-star steps of a
+        star of movie_id to that distance, or None past budget people.
+        """
+        if self.graph is not None:
+            neighbors = self.graph.neighbors
+            stars = self.graph.people_of(self.graph.movie_index_of(movie_id))
+        else:
+            neighbors = degrees.neighbors_for_person
+            stars = degrees.movies[movie_id]["stars"]
+        distances = dict.fromkeys(stars, 0)
+        frontier = list(distances)
+        depth = 0
+        while frontier and depth < radius:
+            depth += 1
+            next_frontier = []
+            for state in frontier:
+                for _, child in neighbors(state):
+                    if child not in distances:
+                        distances[child] = depth
+                        next_frontier.append(child)
+            if len(distances) > budget:
+                return None
+            frontier = next_frontier
+        return distances
+
+    def shortest_path(self, source, target):
+        """
+        Returns the same result as degrees.shortest_path, from the cache
+        when possible.
+        """
+        path = self.lookup(source, target)
+        if path is not False:
+            self.hits += 1
+            return path
+        self.misses += 1
+
+        misses = self.misses_by_source.pop(source, 0) + 1
+        self.misses_by_source[source] = misses
+        if len(self.misses_by_source) > self.max_entries:
+            self.misses_by_source.popitem(last=False)
+        if misses >= self.hot_after:
+            del self.misses_by_source[source]
+            tree = self.build_tree(source)
+            self.store(("tree", source), tree, len(tree) * TREE_ENTRY_SIZE)
+            return self.tree_path(tree, target)
+
+        path = degrees.shortest_path(source, target, self.graph)
+        size = 0 if path is None else len(path) * PATH_STEP_SIZE
+        self.store(("path", source, target), path, size + PATH_STEP_SIZE)
+        return path
+
+    def lookup(self, source, target):
+        """
+        Returns the cached path from source to target, or False if
+        neither it, its reverse nor a tree of either person is cached.
+        """
+        if source == target:
+            return []
+        key = ("path", source, target)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        key = ("path", target, source)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return reverse_path(target, self.entries[key])
+        key = ("tree", source)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.tree_path(self.entries[key], target)
+        key = ("tree", target)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return reverse_path(target,
+                                self.tree_path(self.entries[key], source))
+        return False
+
+    def build_tree(self, source):
+        if self.graph is not None:
+            return degrees.breadth_first_parents(
+                self.graph.index_of(source), self.graph.neighbors
+            )
+        return degrees.breadth_first_parents(
+            source, degrees.neighbors_for_person
+        )
+
+    def tree_path(self, tree, target):
+        if self.graph is not None:
+            return self.graph.translate(degrees.path_from_parents(
+                tree, self.graph.index_of(target)
+            ))
+        return degrees.path_from_parents(tree, target)
+
+    def store(self, key, value, size):
+        if key in self.entries:
+            del self.entries[key]
+            self.size -= self.sizes.pop(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = size
+        self.size += size
+        while self.entries and (
+            len(self.entries) > self.max_entries
+            or (self.max_bytes is not None and self.size > self.max_bytes)
+        ):
+            evicted, _ = self.entries.popitem(last=False)
+            self.size -= self.sizes.pop(evicted)
+            self.evictions += 1
@@ -1,8 +1,13 @@
-import csv
+import argparse
 import sys
+from collections import deque
+from contextlib import nullcontext
 
+from ingest import apply_record, load_into
+from nameindex import NameIndex, disambiguate
+from instrument import SearchStats
+from snapshot import load_graph
 from util import Node, StackFrontier, QueueFrontier
-from collections import deque
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -13,63 +18,69 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
-def load_data(directory):
+# Sorted index over the keys of names, for prefix and fuzzy lookups
+name_index = NameIndex()
+
+def load_data(directory, seeds=None, hops=0):
     """
     Load data from CSV files into memory.
+
+    If seeds is given, only load the people within hops co-star steps
+    of those person_ids. Returns the counts reported by ingest.load_into,
+    including star rows skipped because their person or movie is unknown.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global name_index
+    report = load_into(directory, names, people, movies, seeds, hops)
+    name_index = NameIndex(names)
+    return report
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into an integer-indexed graph, "
+                             "from its snapshot if there is a fresh one")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search statistics")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write JSON search trace events to FILE")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    graph = None
+    if args.compact:
+        graph = load_graph(args.directory)
+    else:
+        report = load_data(args.directory)
+        skipped = (report["orphan_person_stars"]
+                   + report["orphan_movie_stars"] + report["malformed"]
+                   + report["delta_skipped"])
+        if skipped:
+            print(f"Skipped {skipped} rows with unknown people or movies "
+                  "or missing fields.")
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    source = person_id_for_name(input("Name: "), graph)
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = person_id_for_name(input("Name: "), graph)
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    with open(args.trace, "w") if args.trace else nullcontext() as trace:
+        stats = SearchStats(trace) if args.stats or args.trace else None
+        if args.bidirectional:
+            path = bidirectional_shortest_path(source, target, graph, stats)
+        else:
+            path = shortest_path(source, target, graph, stats)
+    if args.stats:
+        print(stats)
 
     if path is None:
         print("Not connected.")
@@ -78,155 +89,276 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_for_id(path[i][1], graph)["name"]
+            person2 = person_for_id(path[i + 1][1], graph)["name"]
+            movie = movie_for_id(path[i + 1][0], graph)["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, graph=None, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    Searches the global dicts, or graph if a CompactGraph is given.
+    If stats is a SearchStats, the search reports to it.
     """
-    # Node for search (movie_id, person_id)
-    currentNode = ()
+    if graph is not None:
+        return graph.translate(breadth_first_search(
+            graph.index_of(source), graph.index_of(target), graph.neighbors,
+            stats
+        ))
+    return breadth_first_search(source, target, neighbors_for_person, stats)
 
-    # Explored Nodes is a list of explored nodes each one assigned to a path (initialization)
-    exploredPaths = {}
 
-    # parentChild is a list of relationship between the tuples
-    parentChild = []
+def breadth_first_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs from source to
+    target, where neighbors(state) gives the (action, state) pairs
+    reachable in one step, or None if target cannot be reached.
+    """
+    if stats is not None:
+        stats.start("breadth_first", source=source, target=target)
+        neighbors = stats.timed(neighbors)
+    try:
+        if source == target:
+            return []
+
+        # Breadth-first search from the source; every person is stored
+        # once, either in the frontier or in the explored set
+        start = Node(state=source, parent=None, action=None)
+        frontier = QueueFrontier()
+        frontier.add(start)
+        explored = set()
+
+        while not frontier.empty():
+            node = frontier.remove()
+            explored.add(node.state)
+            if stats is not None:
+                stats.expand(node.state, len(frontier.frontier))
+
+            for movie_id, person_id in neighbors(node.state):
+                if person_id in explored or frontier.contains_state(person_id):
+                    continue
+                child = Node(state=person_id, parent=node, action=movie_id)
+
+                # Test for the goal as soon as the node is generated
+                if person_id == target:
+                    return path_to(child)
+                frontier.add(child)
+
+        return None
+    finally:
+        if stats is not None:
+            stats.stop()
 
-    # Frontier is a list of nodes (initialization)
-    frontier = deque(neighbors_for_person(source))
-   
-    for i in frontier:
-        parentChild.append((('0',str(source)), (tuple(i))))
 
-    isSolution = False
+def bidirectional_shortest_path(source, target, graph=None, stats=None):
+    """
+    Returns the same result as shortest_path, searching outwards from
+    both the source and the target and joining the two searches where
+    they meet.
+
+    Each step expands one whole layer of whichever side has the smaller
+    frontier, so hub actors are reached from both ends only when needed.
+    """
+    if graph is not None:
+        return graph.translate(bidirectional_search(
+            graph.index_of(source), graph.index_of(target), graph.neighbors,
+            stats
+        ))
+    return bidirectional_search(source, target, neighbors_for_person, stats)
 
-    while (isSolution == False):
-        if (len(frontier) == 0):
-            return None
-        currentNode = tuple(frontier.popleft())
-        isSolution = check_for_solution(currentNode, target)
-        add_current_node_to_explored(currentNode, exploredPaths, parentChild)
-        if (isSolution):
-            break
-        add_new_nodes_to_frontier(frontier, currentNode, exploredPaths, parentChild)
 
-    if (isSolution == False):
+def bidirectional_search(source, target, neighbors, stats=None):
+    """
+    Bidirectional counterpart of breadth_first_search; neighbors must
+    be symmetric, as the co-star graph is.
+    """
+    if stats is not None:
+        stats.start("bidirectional", source=source, target=target)
+        neighbors = stats.timed(neighbors)
+    try:
+        if source == target:
+            return []
+
+        # Maps person_id to (movie_id, neighbor person_id, depth), where
+        # the neighbor is one step closer to the root of that side's search
+        forward = {source: (None, None, 0)}
+        backward = {target: (None, None, 0)}
+        forward_frontier = [source]
+        backward_frontier = [target]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = expand_layer(
+                    forward_frontier, forward, backward, neighbors, stats
+                )
+            else:
+                backward_frontier, meeting = expand_layer(
+                    backward_frontier, backward, forward, neighbors, stats
+                )
+            if meeting is not None:
+                return join_paths(meeting, forward, backward)
+
         return None
+    finally:
+        if stats is not None:
+            stats.stop()
 
-    key = find_key_of_path(currentNode, exploredPaths)
 
-    if (source == target):
-        return list()
-    
-    if(len(exploredPaths[key]) == 0):
-        return list()
-    else:
-        return list(exploredPaths[key])
+def expand_layer(frontier, visited, other, neighbors, stats=None):
+    """
+    Expands every person in frontier, recording new people in visited.
 
-def add_current_node_to_explored(currentNode, exploredPaths, parentChild):
+    Returns the next frontier and the person where this search meets
+    other along the shortest combined path, or None if they do not meet.
+    """
+    next_frontier = []
+    meeting = None
+    best = None
+    for i, person_id in enumerate(frontier):
+        depth = visited[person_id][2] + 1
+        if stats is not None:
+            stats.expand(person_id,
+                         len(frontier) - i - 1 + len(next_frontier))
+        for movie_id, neighbor_id in neighbors(person_id):
+            if neighbor_id in visited:
+                continue
+            visited[neighbor_id] = (movie_id, person_id, depth)
+            next_frontier.append(neighbor_id)
+            if neighbor_id in other:
+                length = depth + other[neighbor_id][2]
+                if best is None or length < best:
+                    best = length
+                    meeting = neighbor_id
+    return next_frontier, meeting
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Returns the list of (movie_id, person_id) pairs from the root of
+    forward to the root of backward through the meeting person.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id][1] is not None:
+        movie_id, parent_id, _ = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id][1] is not None:
+        movie_id, child_id, _ = backward[person_id]
+        path.append((movie_id, child_id))
+        person_id = child_id
+    return path
+
+
+def path_to(node):
+    """
+    Returns the list of (movie_id, person_id) pairs leading from
+    the root of the search to node.
+    """
+    path = []
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+    return path
 
-    if (len(exploredPaths) == 0):
-        exploredPaths[0] = deque([tuple(currentNode)])
-    else:
-        # Get Parent
-        parent = find_parent(currentNode, parentChild)
-        key = find_key_of_path(parent, exploredPaths)
-        if (key == -1):
-            exploredPaths[len(exploredPaths)] = deque([currentNode])
-        else:
-            deque_to_analize = exploredPaths[key]
-            if (deque_to_analize.index(parent) == len(deque_to_analize)):
-                exploredPaths[key].append(currentNode)  
-            else:
-                exploredPaths[len(exploredPaths)] = deque()
-                for i in deque_to_analize:
-                    exploredPaths[len(exploredPaths)-1].append(i)
-                exploredPaths[len(exploredPaths)-1].append(currentNode)
-
-def find_key_of_path(currentNode, exploredPaths):
-    
-    found = False
-    for key, my_deque in exploredPaths.items():
-        if currentNode in my_deque:
-            found = True
-            return key
-            
-    if not found:
-        return -1
-
-def add_new_nodes_to_frontier(frontier, currentNode, exploredPaths, parentChild):
-    
-    for i in neighbors_for_person(currentNode[1]):
-        if (i in frontier) or (check_value_in_paths(i, exploredPaths)):
-            parentChild.append((currentNode, tuple(i)))
-            pass
-        else:
-            frontier.append(i)
-            parentChild.append((currentNode, tuple(i)))
-    
-def check_value_in_paths(currentNode, exploredPaths):
-    # Searching the currentNode in the existing paths
-    value_exists = False
-
-    for key, my_deque in exploredPaths.items():
-        if currentNode in my_deque:
-            value_exists = True
-            break  # Stop searching if the value is found
-    
-    return value_exists
-
-def find_parent(currentNode, parentChild):
-    
-    found_index = None
-    for i, tup in enumerate(parentChild):
-        if currentNode in tup:
-            pair = parentChild[i]
-            if (pair[1] == currentNode):
-                return pair[0]
-            break
-            
-    if found_index == None:
-        raise  RuntimeError
-
-def check_for_solution(currentNode, target):
-
-    if (currentNode[1] == target):
-        return True
-    else:
-        return False
 
-def print_parents(parentChild):
-    print ("\033[34mParent/Child:\033[0m", end = " ")
-    print ("\033[34m", parentChild, "\033[0m")
+def shortest_paths(source, targets, graph=None):
+    """
+    Returns a dict mapping each person_id in targets to the shortest
+    list of (movie_id, person_id) pairs from source, or None if they are
+    not connected.
 
-def print_paths(exploredPaths):
-    print ("\033[32mExplored Paths:\033[0m", end = " ")
-    print ("\033[32m", exploredPaths, "\033[0m")
+    A single breadth-first search from source answers every target.
+    """
+    if graph is not None:
+        indices = {target: graph.index_of(target) for target in targets}
+        paths = breadth_first_tree(
+            graph.index_of(source), indices.values(), graph.neighbors
+        )
+        return {target: graph.translate(paths[index])
+                for target, index in indices.items()}
+    return breadth_first_tree(source, targets, neighbors_for_person)
 
-def print_frontier(frontier):
-    print ("\033[31mFrontier:\033[0m", end = " ")
-    print ("\033[31m", frontier, "\033[0m")
 
-def person_id_for_name(name):
+def breadth_first_tree(source, targets, neighbors):
+    """
+    Grows a breadth-first tree from source until every state in targets
+    has been reached or the graph is exhausted, and returns a dict
+    mapping each target to its path from source (or None).
+    """
+    parents = breadth_first_parents(source, neighbors, targets)
+    return {target: path_from_parents(parents, target) for target in targets}
+
+
+def breadth_first_parents(source, neighbors, targets=None):
+    """
+    Returns a dict mapping every state reached from source to its
+    (action, parent) pair in a breadth-first tree, and source to None.
+
+    The search stops once every state in targets has been reached, or
+    covers the whole component of source if targets is None.
+    """
+    parents = {source: None}
+    remaining = None
+    if targets is not None:
+        remaining = set(targets)
+        remaining.discard(source)
+        if not remaining:
+            return parents
+    frontier = deque([source])
+
+    while frontier:
+        state = frontier.popleft()
+        for action, child in neighbors(state):
+            if child in parents:
+                continue
+            parents[child] = (action, state)
+            frontier.append(child)
+            if remaining is not None:
+                remaining.discard(child)
+                if not remaining:
+                    return parents
+
+    return parents
+
+
+def path_from_parents(parents, target):
+    """
+    Returns the list of (action, state) pairs leading to target in a
+    dict of child -> (action, parent), or None if target is not in it.
+    """
+    if target not in parents:
+        return None
+    path = []
+    while parents[target] is not None:
+        action, parent = parents[target]
+        path.append((action, target))
+        target = parent
+    path.reverse()
+    return path
+
+
+def person_id_for_name(name, graph=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name, graph)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_for_id(person_id, graph)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -241,11 +373,90 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
-def neighbors_for_person(person_id):
+def person_ids_for_name(name, graph=None):
+    """
+    Returns every IMDB id whose name matches, ignoring case.
+    """
+    if graph is not None:
+        return graph.person_ids_for_name(name)
+    return list(names.get(name.lower(), set()))
+
+
+def names_with_prefix(prefix, graph=None, limit=20):
+    """
+    Returns up to limit lowercased names starting with prefix.
+    """
+    index = graph.name_index if graph is not None else name_index
+    return index.prefix(prefix, limit)
+
+
+def names_like(name, max_distance=1, graph=None, limit=20):
+    """
+    Returns up to limit (distance, lowercased name) pairs for names
+    within max_distance edits of name, closest first.
+    """
+    index = graph.name_index if graph is not None else name_index
+    return index.fuzzy(name, max_distance, limit)
+
+
+def find_person_id(name, birth=None, max_distance=0, graph=None):
+    """
+    Returns the IMDB id for a person's name without prompting.
+
+    If no name matches exactly, the closest names within max_distance
+    edits are used instead. Ambiguities are resolved by birth year, if
+    given, and then by number of movies. Returns None if nobody matches.
+    """
+    person_ids = person_ids_for_name(name, graph)
+    if not person_ids and max_distance > 0:
+        matches = names_like(name, max_distance, graph, limit=None)
+        closest = [key for distance, key in matches
+                   if distance == matches[0][0]]
+        for key in closest:
+            person_ids.extend(person_ids_for_name(key, graph))
+    return disambiguate(
+        person_ids, lambda person_id: person_for_id(person_id, graph), birth
+    )
+
+
+def person_for_id(person_id, graph=None):
+    """
+    Returns the dictionary of: name, birth, movies for a person_id.
+    """
+    if graph is not None:
+        return graph.person(person_id)
+    return people[person_id]
+
+
+def movie_for_id(movie_id, graph=None):
+    """
+    Returns the dictionary of: title, year, stars for a movie_id.
+    """
+    if graph is not None:
+        return graph.movie(movie_id)
+    return movies[movie_id]
+
+
+def apply_update(record, graph=None):
+    """
+    Applies one delta record (see ingest.py) to the loaded data, or to
+    graph if given. Returns True if it changed anything.
+    """
+    if graph is not None:
+        return graph.apply(record)
+    changed = apply_record(record, names, people, movies)
+    if changed and record["type"] == "person":
+        name_index.add(record["name"].lower())
+    return changed
+
+
+def neighbors_for_person(person_id, graph=None):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,432 @@
+"""
+Compact in-memory representation of the people/movies/stars data.
+
+People and movies are interned to consecutive integers and the
+person -> movie and movie -> person adjacency is kept in compressed
+sparse row (CSR) form: for person p, the movies they starred in are
+person_movies[person_offsets[p]:person_offsets[p + 1]].
+
+Strings (IMDb ids, names, titles) are stored back to back in one UTF-8
+buffer per column, so the whole graph is a handful of flat arrays
+instead of a dict and a set per person and per movie.
+
+The arrays are never modified. People, movies and star edges added
+later are kept in small dicts alongside them and merged in on access.
+"""
+
+import csv
+from array import array
+from bisect import bisect_left, bisect_right
+
+from ingest import check_record
+from nameindex import NameIndex
+
+
+class StringTable():
+    """
+    Column of strings stored as one UTF-8 buffer plus an offsets array.
+
+    If the table was built with sort=True, order holds the row numbers
+    sorted by string so that rows can be looked up by value.
+    """
+
+    def __init__(self, data, offsets, order=None):
+        self.data = data
+        self.offsets = offsets
+        self.order = order
+
+    @classmethod
+    def build(cls, strings, sort=False):
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        order = None
+        if sort:
+            order = array("i", sorted(range(len(strings)),
+                                      key=strings.__getitem__))
+        return cls(bytes(data), offsets, order)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def sorted_view(self):
+        """Returns the strings as a sequence in sorted order."""
+        return SortedView(self)
+
+    def find_all(self, string):
+        """Returns the rows holding string, in sorted-row order."""
+        view = self.sorted_view()
+        lo = bisect_left(view, string)
+        hi = bisect_right(view, string, lo)
+        return [self.order[k] for k in range(lo, hi)]
+
+    def index(self, string):
+        """Returns the first row holding string, or raises KeyError."""
+        rows = self.find_all(string)
+        if not rows:
+            raise KeyError(string)
+        return rows[0]
+
+
+class SortedView():
+    """Read-only sequence over a sorted StringTable, usable with bisect."""
+
+    def __init__(self, table):
+        if table.order is None:
+            raise ValueError("string table is not sorted")
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, k):
+        return self.table[self.table.order[k]]
+
+
+class CompactGraph():
+    """
+    Integer-indexed CSR graph of people and movies.
+
+    Public methods take and return IMDb id strings like the dict layout
+    in degrees.py; index_of, neighbors and translate work on the
+    interned integers and are what the searches use internally.
+    """
+
+    def __init__(self, person_ids, person_names, person_keys, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_keys = person_keys
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        self.name_index = NameIndex(person_keys.sorted_view())
+
+        # People, movies and star edges added after the graph was built;
+        # they are interned after the ones in the arrays
+        self.added_people = []
+        self.added_movies = []
+        self.added_person_index = {}
+        self.added_movie_index = {}
+        self.added_names = {}
+        self.added_person_movies = {}
+        self.added_movie_people = {}
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds a graph straight from the CSV files in directory without
+        going through the dict layout. Star rows that refer to unknown
+        people or movies are skipped, as in load_data.
+        """
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            people = [(row[0], row[1], row[2]) for row in reader]
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            movies = [(row[0], row[1], row[2]) for row in reader]
+
+        person_index = {row[0]: i for i, row in enumerate(people)}
+        movie_index = {row[0]: i for i, row in enumerate(movies)}
+        edge_people = array("i")
+        edge_movies = array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            for person_id, movie_id in reader:
+                p = person_index.get(person_id)
+                m = movie_index.get(movie_id)
+                if p is not None and m is not None:
+                    edge_people.append(p)
+                    edge_movies.append(m)
+        del person_index, movie_index
+
+        return cls.from_edges(people, movies, edge_people, edge_movies)
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """Builds a graph from the people and movies dicts of degrees.py."""
+        person_rows = [(person_id, person["name"], person["birth"])
+                       for person_id, person in people.items()]
+        movie_rows = [(movie_id, movie["title"], movie["year"])
+                      for movie_id, movie in movies.items()]
+        movie_index = {row[0]: i for i, row in enumerate(movie_rows)}
+        edge_people = array("i")
+        edge_movies = array("i")
+        for p, person in enumerate(people.values()):
+            for movie_id in person["movies"]:
+                edge_people.append(p)
+                edge_movies.append(movie_index[movie_id])
+        return cls.from_edges(person_rows, movie_rows,
+                              edge_people, edge_movies)
+
+    @classmethod
+    def from_edges(cls, people, movies, edge_people, edge_movies):
+        """
+        Builds a graph from (id, name, birth) and (id, title, year) rows
+        and two parallel arrays of person and movie row numbers.
+        Duplicate edges are dropped.
+        """
+        edges = sorted(set(zip(edge_people, edge_movies)))
+        person_offsets, person_movies = csr(
+            len(people), [p for p, _ in edges], [m for _, m in edges]
+        )
+        edges.sort(key=lambda edge: (edge[1], edge[0]))
+        movie_offsets, movie_people = csr(
+            len(movies), [m for _, m in edges], [p for p, _ in edges]
+        )
+        return cls(
+            person_ids=StringTable.build([row[0] for row in people], sort=True),
+            person_names=StringTable.build([row[1] for row in people]),
+            person_keys=StringTable.build([row[1].lower() for row in people],
+                                          sort=True),
+            person_births=StringTable.build([row[2] for row in people]),
+            movie_ids=StringTable.build([row[0] for row in movies], sort=True),
+            movie_titles=StringTable.build([row[1] for row in movies]),
+            movie_years=StringTable.build([row[2] for row in movies]),
+            person_offsets=person_offsets,
+            person_movies=person_movies,
+            movie_offsets=movie_offsets,
+            movie_people=movie_people,
+        )
+
+    def __len__(self):
+        return len(self.person_ids) + len(self.added_people)
+
+    def index_of(self, person_id):
+        """Returns the interned integer for person_id, or raises KeyError."""
+        try:
+            return self.person_ids.index(person_id)
+        except KeyError:
+            if person_id in self.added_person_index:
+                return self.added_person_index[person_id]
+            raise
+
+    def movie_index_of(self, movie_id):
+        """Returns the interned integer for movie_id, or raises KeyError."""
+        try:
+            return self.movie_ids.index(movie_id)
+        except KeyError:
+            if movie_id in self.added_movie_index:
+                return self.added_movie_index[movie_id]
+            raise
+
+    def person_id_at(self, p):
+        """Returns the person_id of interned person p."""
+        if p >= len(self.person_ids):
+            return self.added_people[p - len(self.person_ids)][0]
+        return self.person_ids[p]
+
+    def movie_id_at(self, m):
+        """Returns the movie_id of interned movie m."""
+        if m >= len(self.movie_ids):
+            return self.added_movies[m - len(self.movie_ids)][0]
+        return self.movie_ids[m]
+
+    def person_row(self, p):
+        """Returns (person_id, name, birth) for interned person p."""
+        base = len(self.person_ids)
+        if p >= base:
+            return self.added_people[p - base]
+        return self.person_ids[p], self.person_names[p], self.person_births[p]
+
+    def movie_row(self, m):
+        """Returns (movie_id, title, year) for interned movie m."""
+        base = len(self.movie_ids)
+        if m >= base:
+            return self.added_movies[m - base]
+        return self.movie_ids[m], self.movie_titles[m], self.movie_years[m]
+
+    def movies_of(self, p):
+        """Returns the interned movies person p starred in."""
+        movies = []
+        if p < len(self.person_ids):
+            movies = list(self.person_movies[self.person_offsets[p]:
+                                             self.person_offsets[p + 1]])
+        return movies + self.added_person_movies.get(p, [])
+
+    def people_of(self, m):
+        """Returns the interned people who starred in movie m."""
+        people = []
+        if m < len(self.movie_ids):
+            people = list(self.movie_people[self.movie_offsets[m]:
+                                            self.movie_offsets[m + 1]])
+        return people + self.added_movie_people.get(m, [])
+
+    def movie_count(self, p):
+        """Returns the number of movies person p starred in."""
+        count = len(self.added_person_movies.get(p, ()))
+        if p < len(self.person_ids):
+            count += self.person_offsets[p + 1] - self.person_offsets[p]
+        return count
+
+    def neighbors(self, p):
+        """
+        Returns (movie, person) pairs of interned integers for people
+        who starred with person p, including p itself.
+        """
+        person_offsets = self.person_offsets
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        result = []
+        built = p < len(self.person_ids)
+        if built and not self.added_person_movies:
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = self.person_movies[k]
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    result.append((m, movie_people[j]))
+            return result
+
+        added_people = self.added_movie_people
+        if built:
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = self.person_movies[k]
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    result.append((m, movie_people[j]))
+                for q in added_people.get(m, ()):
+                    result.append((m, q))
+        for m in self.added_person_movies.get(p, ()):
+            for q in self.people_of(m):
+                result.append((m, q))
+        return result
+
+    def translate(self, path):
+        """
+        Converts a path of interned (movie, person) pairs back to IMDb
+        id strings. None is passed through.
+        """
+        if path is None:
+            return None
+        if self.added_people or self.added_movies:
+            return [(self.movie_id_at(m), self.person_id_at(p))
+                    for m, p in path]
+        return [(self.movie_ids[m], self.person_ids[p]) for m, p in path]
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        neighbors = self.neighbors(self.index_of(person_id))
+        return set(self.translate(neighbors))
+
+    def person_ids_for_name(self, name):
+        """Returns the person_ids whose name matches, ignoring case."""
+        return [self.person_ids[p]
+                for p in self.person_keys.find_all(name.lower())
+                ] + self.added_names.get(name.lower(), [])
+
+    def person(self, person_id):
+        """
+        Returns a dictionary of: name, birth, movies (a set of movie_ids),
+        like an entry of people in degrees.py.
+        """
+        p = self.index_of(person_id)
+        _, name, birth = self.person_row(p)
+        return {
+            "name": name,
+            "birth": birth,
+            "movies": {self.movie_id_at(m) for m in self.movies_of(p)},
+        }
+
+    def movie(self, movie_id):
+        """
+        Returns a dictionary of: title, year, stars (a set of person_ids),
+        like an entry of movies in degrees.py.
+        """
+        m = self.movie_index_of(movie_id)
+        _, title, year = self.movie_row(m)
+        return {
+            "title": title,
+            "year": year,
+            "stars": {self.person_id_at(p) for p in self.people_of(m)},
+        }
+
+    def add_person(self, person_id, name, birth=""):
+        """
+        Appends a person after the graph was built. Returns their
+        interned integer, or None if person_id is already known.
+        """
+        try:
+            self.index_of(person_id)
+            return None
+        except KeyError:
+            pass
+        p = len(self)
+        self.added_people.append((person_id, name, birth))
+        self.added_names.setdefault(name.lower(), []).append(person_id)
+        self.name_index.add(name.lower())
+        self.added_person_index[person_id] = p
+        return p
+
+    def add_movie(self, movie_id, title, year=""):
+        """
+        Appends a movie after the graph was built. Returns its interned
+        integer, or None if movie_id is already known.
+        """
+        try:
+            self.movie_index_of(movie_id)
+            return None
+        except KeyError:
+            pass
+        m = len(self.movie_ids) + len(self.added_movies)
+        self.added_movies.append((movie_id, title, year))
+        self.added_movie_index[movie_id] = m
+        return m
+
+    def add_star(self, person_id, movie_id):
+        """
+        Records that person_id starred in movie_id, both already known.
+        Returns the interned (person, movie) pair, or None if the edge
+        already exists. Raises KeyError for an unknown person or movie.
+        """
+        p = self.index_of(person_id)
+        m = self.movie_index_of(movie_id)
+        if m in self.movies_of(p):
+            return None
+        self.added_movie_people.setdefault(m, []).append(p)
+        self.added_person_movies.setdefault(p, []).append(m)
+        return p, m
+
+    def apply(self, record):
+        """
+        Applies one delta record, as read by ingest.read_delta. Returns
+        True if it changed the graph.
+        """
+        check_record(record)
+        if record["type"] == "person":
+            return self.add_person(record["id"], record["name"],
+                                   record.get("birth", "")) is not None
+        if record["type"] == "movie":
+            return self.add_movie(record["id"], record["title"],
+                                  record.get("year", "")) is not None
+        return self.add_star(record["person_id"],
+                             record["movie_id"]) is not None
+
+
+def csr(count, rows, columns):
+    """
+    Returns (offsets, targets) arrays for edges given as parallel rows
+    and columns lists already sorted by row.
+    """
+    offsets = array("q", bytes(8 * (count + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, array("i", columns)
@@ -0,0 +1,308 @@
+"""
+Streaming CSV ingestion for the dict layout of degrees.py.
+
+Files are read through a large buffer and parsed positionally with
+csv.reader, so no dict is built per row. Every id is interned, so the
+person_id and movie_id strings held in the stars sets are the same
+objects as the keys of people and movies rather than fresh copies.
+
+Rows that cannot be used are counted instead of silently dropped, and
+loading can be restricted to the people and movies within a number of
+hops of a set of seed people.
+
+People, movies and star edges added after the CSVs were written live in
+a delta log next to them, one JSON record per line:
+
+    {"type": "person", "id": ..., "name": ..., "birth": ...}
+    {"type": "movie", "id": ..., "title": ..., "year": ...}
+    {"type": "star", "person_id": ..., "movie_id": ...}
+
+which is replayed on top of the CSVs whenever they are loaded. Records
+that cannot be applied, such as a star of an unknown person, are
+counted and skipped.
+"""
+
+import csv
+import json
+import os
+import sys
+
+CHUNK_SIZE = 1 << 20
+DELTA_NAME = "degrees.delta.jsonl"
+
+# Fields every delta record of a type must have
+DELTA_FIELDS = {
+    "person": ("id", "name"),
+    "movie": ("id", "title"),
+    "star": ("person_id", "movie_id"),
+}
+
+COLUMNS = {
+    "people.csv": ("id", "name", "birth"),
+    "movies.csv": ("id", "title", "year"),
+    "stars.csv": ("person_id", "movie_id"),
+}
+
+
+def read_rows(directory, filename, report):
+    """
+    Yields the columns of filename as tuples, in the order listed in
+    COLUMNS, whatever their order in the file. Rows with too few fields
+    are counted in report["malformed"] and skipped.
+    """
+    with open(f"{directory}/{filename}", encoding="utf-8", newline="",
+              buffering=CHUNK_SIZE) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            positions = [header.index(column)
+                         for column in COLUMNS[filename]]
+        except ValueError:
+            raise ValueError(f"{filename} must have columns "
+                             f"{', '.join(COLUMNS[filename])}")
+        width = max(positions) + 1
+        for row in reader:
+            if len(row) < width:
+                if row:
+                    report["malformed"] += 1
+                continue
+            yield tuple(row[i] for i in positions)
+
+
+def star_pairs(directory, report):
+    """
+    Yields the (person_id, movie_id) pairs of stars.csv, then those of
+    the star records in the delta log.
+    """
+    yield from read_rows(directory, "stars.csv", report)
+    for record in read_delta(directory):
+        try:
+            check_record(record)
+        except ValueError:
+            continue
+        if record["type"] == "star":
+            yield record["person_id"], record["movie_id"]
+
+
+def neighborhood(directory, seeds, hops):
+    """
+    Returns (person_ids, movie_ids) reachable from the seed person_ids
+    in at most hops co-star steps, counting the star edges of the delta
+    log. Each hop scans the stars twice, so memory stays proportional
+    to the neighborhood, not the dataset.
+    """
+    selected_people = set(seeds)
+    selected_movies = set()
+    frontier = set(seeds)
+    scratch = {"malformed": 0}
+    for _ in range(hops):
+        if not frontier:
+            break
+        new_movies = {
+            movie_id
+            for person_id, movie_id in star_pairs(directory, scratch)
+            if person_id in frontier and movie_id not in selected_movies
+        }
+        selected_movies |= new_movies
+        frontier = {
+            person_id
+            for person_id, movie_id in star_pairs(directory, scratch)
+            if movie_id in new_movies and person_id not in selected_people
+        }
+        selected_people |= frontier
+    return selected_people, selected_movies
+
+
+def load_into(directory, names, people, movies, seeds=None, hops=0):
+    """
+    Loads the CSV files in directory into the names, people and movies
+    dicts, in the layout documented in degrees.py.
+
+    If seeds is given, only people within hops co-star steps of those
+    person_ids are loaded, along with the movies that connect them;
+    distances from the seeds are exact up to hops. The delta log is
+    replayed for them too.
+
+    Returns a dict of counts: people, movies and stars loaded, and
+    malformed rows, duplicate star rows and star rows skipped because
+    their person or movie is unknown, then delta records applied and
+    delta records skipped because they are malformed or name an unknown
+    person or movie.
+    """
+    report = {
+        "people": 0,
+        "movies": 0,
+        "stars": 0,
+        "malformed": 0,
+        "duplicate_stars": 0,
+        "orphan_person_stars": 0,
+        "orphan_movie_stars": 0,
+    }
+
+    selected_people = selected_movies = None
+    if seeds is not None:
+        selected_people, selected_movies = neighborhood(directory, seeds,
+                                                        hops)
+
+    # Load people
+    for person_id, name, birth in read_rows(directory, "people.csv", report):
+        if selected_people is not None and person_id not in selected_people:
+            continue
+        add_person(names, people, person_id, name, birth)
+        report["people"] += 1
+
+    # Load movies
+    for movie_id, title, year in read_rows(directory, "movies.csv", report):
+        if selected_movies is not None and movie_id not in selected_movies:
+            continue
+        movie_id = sys.intern(movie_id)
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+        report["movies"] += 1
+
+    # Load stars
+    for person_id, movie_id in read_rows(directory, "stars.csv", report):
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is None or movie is None:
+            if selected_people is None:
+                if person is None:
+                    report["orphan_person_stars"] += 1
+                else:
+                    report["orphan_movie_stars"] += 1
+            continue
+        if movie_id in person["movies"]:
+            report["duplicate_stars"] += 1
+            continue
+        person["movies"].add(sys.intern(movie_id))
+        movie["stars"].add(sys.intern(person_id))
+        report["stars"] += 1
+
+    # Replay updates made since the CSVs were written
+    def apply(record):
+        if selected_people is not None:
+            check_record(record)
+            if not in_selection(record, selected_people, selected_movies):
+                return False
+        return apply_record(record, names, people, movies)
+    replay_delta(directory, apply, report)
+
+    return report
+
+
+def in_selection(record, person_ids, movie_ids):
+    """
+    Returns True if a valid delta record only concerns the people and
+    movies in person_ids and movie_ids.
+    """
+    if record["type"] == "person":
+        return record["id"] in person_ids
+    if record["type"] == "movie":
+        return record["id"] in movie_ids
+    return record["person_id"] in person_ids and \
+        record["movie_id"] in movie_ids
+
+
+def add_person(names, people, person_id, name, birth=""):
+    """
+    Adds a person to the names and people dicts. Returns False if
+    person_id is already known.
+    """
+    if person_id in people:
+        return False
+    person_id = sys.intern(person_id)
+    people[person_id] = {"name": name, "birth": birth, "movies": set()}
+    key = name.lower()
+    if key not in names:
+        names[key] = {person_id}
+    else:
+        names[key].add(person_id)
+    return True
+
+
+def add_movie(movies, movie_id, title, year=""):
+    """
+    Adds a movie to the movies dict. Returns False if movie_id is
+    already known.
+    """
+    if movie_id in movies:
+        return False
+    movies[sys.intern(movie_id)] = {"title": title, "year": year,
+                                    "stars": set()}
+    return True
+
+
+def add_star(people, movies, person_id, movie_id):
+    """
+    Records that a known person starred in a known movie. Returns False
+    if they already did, and raises KeyError for an unknown id.
+    """
+    person = people[person_id]
+    movie = movies[movie_id]
+    if movie_id in person["movies"]:
+        return False
+    person["movies"].add(sys.intern(movie_id))
+    movie["stars"].add(sys.intern(person_id))
+    return True
+
+
+def check_record(record):
+    """
+    Raises ValueError unless record is a delta record with every field
+    its type requires.
+    """
+    if not isinstance(record, dict) or record.get("type") not in DELTA_FIELDS:
+        raise ValueError(f"unknown delta record: {record!r}")
+    for field in DELTA_FIELDS[record["type"]]:
+        if not isinstance(record.get(field), str):
+            raise ValueError(f"delta record needs {field}: {record!r}")
+
+
+def apply_record(record, names, people, movies):
+    """
+    Applies one delta record to the dicts. Returns True if it changed
+    them; raises ValueError for a malformed record and KeyError for a
+    star whose person or movie is unknown.
+    """
+    check_record(record)
+    if record["type"] == "person":
+        return add_person(names, people, record["id"], record["name"],
+                          record.get("birth", ""))
+    if record["type"] == "movie":
+        return add_movie(movies, record["id"], record["title"],
+                         record.get("year", ""))
+    return add_star(people, movies, record["person_id"], record["movie_id"])
+
+
+def read_delta(directory):
+    """
+    Yields the records of the delta log in directory, in the order they
+    were appended. Yields nothing if there is no log. Lines that are not
+    valid JSON yield their text, which check_record rejects.
+    """
+    path = os.path.join(directory, DELTA_NAME)
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield line.strip()
+
+
+def replay_delta(directory, apply, report):
+    """
+    Calls apply(record) for every record of the delta log in directory.
+    Counts in report["delta"] the records it returned True for, and in
+    report["delta_skipped"] those it raised ValueError or KeyError for,
+    rather than failing the whole load over one bad or stale record.
+    """
+    report["delta"] = 0
+    report["delta_skipped"] = 0
+    for record in read_delta(directory):
+        try:
+            if apply(record):
+                report["delta"] += 1
+        except (KeyError, ValueError):
+            report["delta_skipped"] += 1
@@ -0,0 +1,274 @@
+"""
+Landmark distance oracle for a CompactGraph.
+
+A breadth-first search from each of k landmark people stores the
+distance from that landmark to everybody. For any two people s and t
+and any landmark l, the triangle inequality gives
+
+    |d(l, s) - d(l, t)| <= d(s, t) <= d(l, s) + d(l, t)
+
+so the stored arrays bound every distance in O(k) time. The lower bound
+is also an admissible, consistent heuristic for A* (the ALT algorithm),
+which finds shortest paths while expanding far fewer people than a
+breadth-first search.
+
+People who are in a different component from a landmark have distance
+-1 to it; if a landmark reaches exactly one of s and t, they are not
+connected at all.
+
+Usage: python landmarks.py [directory] [--landmarks K] [--output FILE]
+"""
+
+import argparse
+import heapq
+from array import array
+
+from snapshot import load_graph
+
+LANDMARKS_NAME = "degrees.landmarks"
+UNREACHED = -1
+
+
+def distances_from(graph, source):
+    """
+    Returns an array with the number of co-star steps from source to
+    every person in graph, or UNREACHED.
+    """
+    distances = array("h", [UNREACHED]) * len(graph)
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for p in frontier:
+            for _, q in graph.neighbors(p):
+                if distances[q] == UNREACHED:
+                    distances[q] = depth
+                    next_frontier.append(q)
+        frontier = next_frontier
+    return distances
+
+
+def choose_landmarks(graph, count):
+    """
+    Picks count landmarks: the person with the most movies first, then
+    repeatedly the reachable person farthest from all landmarks so far.
+    Yields (landmark, distances) pairs.
+    """
+    if not len(graph):
+        return
+    landmark = max(range(len(graph)), key=graph.movie_count)
+    closest = None
+    for _ in range(count):
+        distances = distances_from(graph, landmark)
+        yield landmark, distances
+        if closest is None:
+            closest = array("h", distances)
+        else:
+            for p, d in enumerate(distances):
+                if d != UNREACHED and (closest[p] == UNREACHED
+                                       or d < closest[p]):
+                    closest[p] = d
+        landmark = max(range(len(graph)), key=closest.__getitem__)
+        if closest[landmark] <= 0:
+            return
+
+
+class LandmarkOracle():
+    """
+    Distance bounds and ALT shortest paths over a CompactGraph.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """Runs a breadth-first search from count landmarks."""
+        landmarks = []
+        distances = []
+        for landmark, row in choose_landmarks(graph, count):
+            landmarks.append(landmark)
+            distances.append(row)
+        return cls(graph, landmarks, distances)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            array("q", [len(self.landmarks), len(self.graph)]).tofile(f)
+            array("q", self.landmarks).tofile(f)
+            for row in self.distances:
+                row.tofile(f)
+
+    @classmethod
+    def load(cls, graph, path):
+        """
+        Reads arrays written by save. Raises ValueError if they were
+        built for a graph of a different size.
+        """
+        with open(path, "rb") as f:
+            header = array("q")
+            header.fromfile(f, 2)
+            count, size = header
+            if size != len(graph):
+                raise ValueError("landmarks were built for another graph")
+            landmarks = array("q")
+            landmarks.fromfile(f, count)
+            distances = []
+            for _ in range(count):
+                row = array("h")
+                row.fromfile(f, size)
+                distances.append(row)
+        return cls(graph, list(landmarks), distances)
+
+    def add_person(self):
+        """Extends the distances for a person just added to the graph."""
+        for row in self.distances:
+            row.append(UNREACHED)
+
+    def add_star(self, p, m):
+        """
+        Updates the distances after interned person p was added to the
+        stars of movie m. Only the people the new edge brings closer to
+        a landmark are visited. Returns the number of distances lowered.
+        """
+        stars = self.graph.people_of(m)
+        lowered = 0
+        for row in self.distances:
+            # Relax outward from the stars, nearest first
+            heap = [(row[q], q) for q in stars if row[q] != UNREACHED]
+            heapq.heapify(heap)
+            while heap:
+                d, q = heapq.heappop(heap)
+                if d != row[q]:
+                    continue
+                for _, r in self.graph.neighbors(q):
+                    if row[r] == UNREACHED or row[r] > d + 1:
+                        row[r] = d + 1
+                        lowered += 1
+                        heapq.heappush(heap, (d + 1, r))
+        return lowered
+
+    def bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the distance between interned
+        people s and t, or None if they are certainly not connected.
+        upper is None if no landmark reaches them.
+        """
+        if s == t:
+            return 0, 0
+        lower = 1
+        upper = None
+        for row in self.distances:
+            ds = row[s]
+            dt = row[t]
+            if (ds == UNREACHED) != (dt == UNREACHED):
+                return None
+            if ds == UNREACHED:
+                continue
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def distance_bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two person_ids, or None if they are not connected.
+        """
+        return self.bounds(self.graph.index_of(source),
+                           self.graph.index_of(target))
+
+    def heuristic(self, t):
+        """
+        Returns a function giving a lower bound on the distance from a
+        person to t, or None for people who cannot reach t.
+        """
+        targets = [(row, row[t]) for row in self.distances]
+
+        def h(p):
+            best = 0
+            for row, dt in targets:
+                dp = row[p]
+                if (dp == UNREACHED) != (dt == UNREACHED):
+                    return None
+                if dp != UNREACHED and abs(dp - dt) > best:
+                    best = abs(dp - dt)
+            return best
+        return h
+
+    def search(self, s, t, neighbors=None):
+        """
+        Returns the shortest list of interned (movie, person) pairs from
+        s to t using A* guided by the landmarks, or None.
+        """
+        if s == t:
+            return []
+        if self.bounds(s, t) is None:
+            return None
+        neighbors = neighbors or self.graph.neighbors
+        h = self.heuristic(t)
+
+        cost = {s: 0}
+        parents = {s: None}
+        closed = set()
+        heap = [(h(s), 0, s)]
+        while heap:
+            _, negative_cost, p = heapq.heappop(heap)
+            if p == t:
+                path = []
+                while parents[p] is not None:
+                    m, parent = parents[p]
+                    path.append((m, p))
+                    p = parent
+                path.reverse()
+                return path
+            if p in closed:
+                continue
+            closed.add(p)
+            g = -negative_cost + 1
+            for m, q in neighbors(p):
+                if q in closed or cost.get(q, g + 1) <= g:
+                    continue
+                estimate = h(q)
+                if estimate is None:
+                    continue
+                cost[q] = g
+                parents[q] = (m, p)
+                # Ties go to the deeper person, which is closer to t
+                heapq.heappush(heap, (g + estimate, -g, q))
+        return None
+
+    def shortest_path(self, source, target):
+        """
+        Returns the same result as degrees.shortest_path for two
+        person_ids.
+        """
+        return self.graph.translate(self.search(
+            self.graph.index_of(source), self.graph.index_of(target)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python landmarks.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--landmarks", type=int, default=16)
+    parser.add_argument("--output",
+                        help=f"default: {LANDMARKS_NAME} in the directory")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    graph = load_graph(args.directory)
+    print("Choosing landmarks...")
+    oracle = LandmarkOracle.build(graph, args.landmarks)
+    output = args.output or f"{args.directory}/{LANDMARKS_NAME}"
+    oracle.save(output)
+    print(f"Wrote {len(oracle.landmarks)} landmarks to {output}.")
+
+
+if __name__ == "__main__":
+    main()
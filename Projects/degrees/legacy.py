@@ -0,0 +1,183 @@
+"""
+Original explored-paths search, its debug printers and DictReader loader
+used by degrees.py before the parent-pointer breadth-first search, the
+search instrumentation and the streaming ingestion, kept for
+benchmarking.
+"""
+
+import csv
+from collections import deque
+
+from degrees import names, neighbors_for_person, people, movies
+
+
+def load_data(directory):
+    """
+    Load data from CSV files into memory.
+    """
+    # Load people
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            if row["name"].lower() not in names:
+                names[row["name"].lower()] = {row["id"]}
+            else:
+                names[row["name"].lower()].add(row["id"])
+
+    # Load movies
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+
+    # Load stars
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+
+
+def shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    If no possible path, returns None.
+    """
+    # Node for search (movie_id, person_id)
+    currentNode = ()
+
+    # Explored Nodes is a list of explored nodes each one assigned to a path (initialization)
+    exploredPaths = {}
+
+    # parentChild is a list of relationship between the tuples
+    parentChild = []
+
+    # Frontier is a list of nodes (initialization)
+    frontier = deque(neighbors_for_person(source))
+   
+    for i in frontier:
+        parentChild.append((('0',str(source)), (tuple(i))))
+
+    isSolution = False
+
+    while (isSolution == False):
+        if (len(frontier) == 0):
+            return None
+        currentNode = tuple(frontier.popleft())
+        isSolution = check_for_solution(currentNode, target)
+        add_current_node_to_explored(currentNode, exploredPaths, parentChild)
+        if (isSolution):
+            break
+        add_new_nodes_to_frontier(frontier, currentNode, exploredPaths, parentChild)
+
+    if (isSolution == False):
+        return None
+
+    key = find_key_of_path(currentNode, exploredPaths)
+
+    if (source == target):
+        return list()
+    
+    if(len(exploredPaths[key]) == 0):
+        return list()
+    else:
+        return list(exploredPaths[key])
+
+def add_current_node_to_explored(currentNode, exploredPaths, parentChild):
+
+    if (len(exploredPaths) == 0):
+        exploredPaths[0] = deque([tuple(currentNode)])
+    else:
+        # Get Parent
+        parent = find_parent(currentNode, parentChild)
+        key = find_key_of_path(parent, exploredPaths)
+        if (key == -1):
+            exploredPaths[len(exploredPaths)] = deque([currentNode])
+        else:
+            deque_to_analize = exploredPaths[key]
+            if (deque_to_analize.index(parent) == len(deque_to_analize)):
+                exploredPaths[key].append(currentNode)  
+            else:
+                exploredPaths[len(exploredPaths)] = deque()
+                for i in deque_to_analize:
+                    exploredPaths[len(exploredPaths)-1].append(i)
+                exploredPaths[len(exploredPaths)-1].append(currentNode)
+
+def find_key_of_path(currentNode, exploredPaths):
+    
+    found = False
+    for key, my_deque in exploredPaths.items():
+        if currentNode in my_deque:
+            found = True
+            return key
+            
+    if not found:
+        return -1
+
+def add_new_nodes_to_frontier(frontier, currentNode, exploredPaths, parentChild):
+    
+    for i in neighbors_for_person(currentNode[1]):
+        if (i in frontier) or (check_value_in_paths(i, exploredPaths)):
+            parentChild.append((currentNode, tuple(i)))
+            pass
+        else:
+            frontier.append(i)
+            parentChild.append((currentNode, tuple(i)))
+    
+def check_value_in_paths(currentNode, exploredPaths):
+    # Searching the currentNode in the existing paths
+    value_exists = False
+
+    for key, my_deque in exploredPaths.items():
+        if currentNode in my_deque:
+            value_exists = True
+            break  # Stop searching if the value is found
+    
+    return value_exists
+
+def find_parent(currentNode, parentChild):
+    
+    found_index = None
+    for i, tup in enumerate(parentChild):
+        if currentNode in tup:
+            pair = parentChild[i]
+            if (pair[1] == currentNode):
+                return pair[0]
+            break
+            
+    if found_index == None:
+        raise  RuntimeError
+
+def check_for_solution(currentNode, target):
+
+    if (currentNode[1] == target):
+        return True
+    else:
+        return False
+
+
+def print_parents(parentChild):
+    print ("\033[34mParent/Child:\033[0m", end = " ")
+    print ("\033[34m", parentChild, "\033[0m")
+
+def print_paths(exploredPaths):
+    print ("\033[32mExplored Paths:\033[0m", end = " ")
+    print ("\033[32m", exploredPaths, "\033[0m")
+
+def print_frontier(frontier):
+    print ("\033[31mFrontier:\033[0m", end = " ")
+    print ("\033[31m", frontier, "\033[0m")
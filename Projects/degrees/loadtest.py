@@ -0,0 +1,143 @@
+"""
+Load test for server.py.
+
+Sends path or distance queries for pairs of people to a running
+service from a number of concurrent keep-alive connections, then
+reports throughput, status codes and latency percentiles.
+
+Pairs are read from a file, in any format batch.py accepts, or sampled
+at random from the people in a directory.
+
+Usage: python loadtest.py [--url URL] (--pairs FILE | --directory DIR)
+                          [--requests N] [--concurrency C]
+                          [--endpoint path|distance]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+from batch import parse_pair
+from snapshot import load_graph
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def read_pairs(path):
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            pair = parse_pair(line)
+            if pair is not None:
+                pairs.append(pair[:2])
+    return pairs
+
+
+def sample_pairs(directory, count, seed=0):
+    graph = load_graph(directory)
+    generator = random.Random(seed)
+    return [(graph.person_id_at(generator.randrange(len(graph))),
+             graph.person_id_at(generator.randrange(len(graph))))
+            for _ in range(count)]
+
+
+async def request(reader, writer, host, target):
+    """Sends one GET and returns (status, body)."""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, endpoint, queue, latencies, statuses):
+    """Sends queries from queue over one connection until it is empty."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            source, target = queue.get_nowait()
+            query = urlencode({"source": source, "target": target})
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host,
+                                      f"/{endpoint}?{query}")
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(url, pairs, requests, concurrency, endpoint):
+    address = urlsplit(url)
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(pairs[i % len(pairs)])
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(address.hostname, address.port or 80, endpoint, queue,
+               latencies, statuses)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "statuses": {str(status): count
+                     for status, count in sorted(statuses.items())},
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python loadtest.py [options] (--pairs FILE | --directory DIR)"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    pairs = parser.add_mutually_exclusive_group(required=True)
+    pairs.add_argument("--pairs", help="file of pairs, one per line")
+    pairs.add_argument("--directory",
+                       help="sample random pairs of people from this data")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoint", choices=["path", "distance"],
+                        default="path")
+    args = parser.parse_args()
+
+    if args.pairs:
+        pairs = read_pairs(args.pairs)
+    else:
+        pairs = sample_pairs(args.directory, args.requests)
+    if not pairs:
+        sys.exit("No pairs to query.")
+
+    report = asyncio.run(run(args.url, pairs, args.requests,
+                             args.concurrency, args.endpoint))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Sorted index of lowercased person names.
+
+The index keeps the distinct names sorted, and the same names spelled
+backwards, also sorted. Every prefix of a name corresponds to one
+contiguous range of either list, found by binary search, so each list
+is an implicit trie. Prefix search is one such range.
+
+Fuzzy search walks the tries with a bit-parallel Levenshtein automaton
+(one bitmask of matched query positions per number of edits) and
+abandons a prefix as soon as no position is within reach. Walking all
+prefixes within a few edits near the root would visit most of the
+trie, so the query is split in two: a name within d edits of it is
+within d // 2 edits of its first part, or within d - d // 2 - 1 edits
+of its second part. The first case is a walk of the forward trie that
+allows only d // 2 edits until the first part has been read, the
+second one a walk of the backward trie with the query reversed, and
+both stay in small subtrees.
+
+The lists are built on first use rather than when the data is loaded,
+since exact lookups do not need them and sorting millions of names
+takes seconds; QueryPool builds them before starting its workers, so
+that they share one copy.
+"""
+
+from bisect import bisect_left, insort
+
+# Sorts after any character that can appear in a name
+HIGHEST = "\U0010ffff"
+
+
+class NameIndex():
+    """
+    Prefix and fuzzy lookup over lowercased names.
+
+    keys may be any iterable of names, with duplicates (one per person,
+    as in a CompactGraph); the index keeps two sorted lists of the
+    distinct ones, built once, by build.
+    """
+
+    def __init__(self, keys=()):
+        self.source = keys
+        self.added = []
+        self.keys = None
+        self.reversed_keys = None
+
+    def build(self):
+        """Sorts the names, unless done already."""
+        if self.keys is None:
+            # Sorted input, as from a CompactGraph, sorts in linear time
+            self.keys = sorted(dict.fromkeys(self.source))
+            self.reversed_keys = sorted(key[::-1] for key in self.keys)
+            self.source = None
+            for key in self.added:
+                self.add(key)
+            self.added = None
+
+    @classmethod
+    def from_names(cls, names):
+        """Builds an index over the keys of the names dict of degrees.py."""
+        return cls(names)
+
+    def __len__(self):
+        self.build()
+        return len(self.keys)
+
+    def __contains__(self, key):
+        self.build()
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def add(self, key):
+        """Inserts key in order, if the index lacks it."""
+        if self.keys is None:
+            self.added.append(key)
+        elif key not in self:
+            insort(self.keys, key)
+            insort(self.reversed_keys, key[::-1])
+
+    def prefix_range(self, prefix, lo=0, hi=None):
+        """Returns (lo, hi) such that keys[lo:hi] start with prefix."""
+        self.build()
+        if hi is None:
+            hi = len(self.keys)
+        start = bisect_left(self.keys, prefix, lo, hi)
+        end = bisect_left(self.keys, prefix + HIGHEST, start, hi)
+        return start, end
+
+    def prefix(self, prefix, limit=20):
+        """
+        Returns up to limit distinct names starting with prefix, in
+        sorted order.
+        """
+        lo, hi = self.prefix_range(prefix.lower())
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.keys[lo:hi]
+
+    def fuzzy(self, name, max_distance=1, limit=20):
+        """
+        Returns up to limit (distance, name) pairs for the names within
+        max_distance insertions, deletions or substitutions of name,
+        closest first.
+        """
+        self.build()
+        name = name.lower()
+        if max_distance <= 0:
+            return [(0, name)] if name in self else []
+
+        # A name within max_distance edits is within first edits of
+        # name[:split] or within second edits of name[split:]
+        first = max_distance // 2
+        second = max_distance - first - 1
+        split = (len(name) + 1) // 2
+        found = {}
+        self.walk(self.keys, name, split, first, max_distance, found, False)
+        self.walk(self.reversed_keys, name[::-1], len(name) - split + 1,
+                  second, max_distance, found, True)
+        matches = sorted((distance, key) for key, distance in found.items())
+        return matches if limit is None else matches[:limit]
+
+    def walk(self, keys, query, split, early, max_distance, found, backward):
+        """
+        Records in found every key within max_distance edits of query,
+        with at most early edits until query[:split] has been read, and
+        the smallest number of edits to it under that restriction.
+
+        State bit i of level e is set when the prefix walked so far is
+        within e edits of query[:i]. The names in keys are reversed back
+        if backward.
+        """
+        length = len(query)
+        accept = 1 << length
+        letters = {}
+        for i, char in enumerate(query):
+            letters[char] = letters.get(char, 0) | (2 << i)
+
+        # Positions before split may only be reached within early edits
+        all_positions = (2 << length) - 1
+        restricted = (1 << split) - 1
+        masks = [all_positions if e <= early else all_positions ^ restricted
+                 for e in range(max_distance + 1)]
+
+        # The empty prefix is within i edits of query[:i] (deletions)
+        levels = []
+        below = 0
+        for e in range(max_distance + 1):
+            below = (((2 << e) - 1) & masks[e]) | below
+            levels.append(below)
+
+        def step(levels, matching):
+            """Returns the levels after a letter matching those positions."""
+            children = []
+            old_below = new_below = 0
+            for e, level in enumerate(levels):
+                # Match, extra letter, substitution or skipped letter
+                reached = (((level << 1) & matching) | old_below
+                           | ((old_below | new_below) << 1))
+                new_below = (reached & masks[e]) | new_below
+                children.append(new_below)
+                old_below = level
+            return children
+
+        stack = [(0, len(keys), 0, levels)]
+        while stack:
+            lo, hi, depth, levels = stack.pop()
+
+            # keys[lo] is the prefix itself if any key ends here
+            if lo < hi and len(keys[lo]) == depth:
+                for e, level in enumerate(levels):
+                    if level & accept:
+                        key = keys[lo][::-1] if backward else keys[lo]
+                        if e < found.get(key, e + 1):
+                            found[key] = e
+                        break
+                lo += 1
+            if lo == hi:
+                continue
+
+            # Letters not in query all lead to the same levels; if those
+            # are dead, only look up the children for letters of query
+            missing = step(levels, 0)
+            if not missing[-1]:
+                prefix = keys[lo][:depth]
+                for char, matching in letters.items():
+                    children = step(levels, matching)
+                    if children[-1]:
+                        child_lo = bisect_left(keys, prefix + char, lo, hi)
+                        child_hi = bisect_left(keys, prefix + char + HIGHEST,
+                                               child_lo, hi)
+                        if child_lo < child_hi:
+                            stack.append((child_lo, child_hi, depth + 1,
+                                          children))
+                continue
+
+            while lo < hi:
+                key = keys[lo]
+                char = key[depth]
+                child_hi = bisect_left(keys, key[:depth + 1] + HIGHEST,
+                                       lo, hi)
+                if char in letters:
+                    children = step(levels, letters[char])
+                else:
+                    children = missing
+                if children[-1]:
+                    stack.append((lo, child_hi, depth + 1, children))
+                lo = child_hi
+
+
+def disambiguate(person_ids, people, birth=None):
+    """
+    Picks one person_id without prompting: the candidates are narrowed
+    to those born in birth, if given, and the one who starred in the
+    most movies wins (ties go to the smallest id).
+
+    people(person_id) must return a dict of: name, birth, movies.
+    Returns None if no candidate is left.
+    """
+    candidates = list(person_ids)
+    if birth is not None:
+        candidates = [person_id for person_id in candidates
+                      if people(person_id)["birth"] == str(birth)]
+    if not candidates:
+        return None
+    return min(candidates,
+               key=lambda person_id: (-len(people(person_id)["movies"]),
+                                      person_id))
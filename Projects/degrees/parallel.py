@@ -0,0 +1,180 @@
+"""
+Runs degrees searches on a pool of worker processes.
+
+The data is loaded once in the parent process. Where the platform can
+fork, workers inherit it copy-on-write instead of receiving a pickled
+copy; the garbage collector is frozen first so that it does not touch,
+and therefore copy, every object the workers inherit. The compact
+layout shares best, since it is a few large arrays and, when loaded
+from a snapshot, a file mapping every process reads from the same page
+cache. Without fork, each worker loads the data itself at start-up.
+
+Workers keep the data as it was when they started. After updating the
+data in the parent (see updates.py), restart replaces them with workers
+that see the update, while the old ones finish what they were running.
+
+Every worker is started as soon as its pool is, rather than on the
+first query. A forked worker closes the sockets it inherited, such as
+the listening socket and open connections of server.py when a restart
+forks it from a running server, so that they do not outlive the parent.
+"""
+
+import gc
+import multiprocessing
+import os
+import stat
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import degrees
+from snapshot import load_graph
+
+# Graph searched in this process; None means the dicts in degrees.py
+graph = None
+
+
+def load(directory, compact=False):
+    """
+    Loads directory into this process, as a CompactGraph if compact.
+    """
+    global graph
+    if compact:
+        graph = load_graph(directory)
+    else:
+        degrees.load_data(directory)
+
+
+def close_sockets():
+    """
+    Closes every socket this process inherited. The pipes the pool
+    talks to a worker through are not sockets and stay open.
+    """
+    if os.path.isdir("/proc/self/fd"):
+        descriptors = [int(fd) for fd in os.listdir("/proc/self/fd")]
+    else:
+        descriptors = range(3, 1024)
+    for fd in descriptors:
+        try:
+            if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def ready():
+    """Does nothing, in a worker; see QueryPool.start."""
+
+
+def search_group(source, targets):
+    """
+    Returns (source, paths) where paths maps each target to its path.
+    """
+    return source, degrees.shortest_paths(source, targets, graph)
+
+
+def call(function, arguments):
+    """
+    Returns function(graph, *arguments) for the graph of this process.
+    """
+    return function(graph, *arguments)
+
+
+class QueryPool():
+    """
+    Process pool answering groups of queries that share a source.
+    """
+
+    def __init__(self, directory, compact=False, workers=None):
+        self.directory = directory
+        self.compact = compact
+        self.workers = workers or os.cpu_count() or 1
+        load(directory, compact)
+        self.graph = graph
+        self.executor = self.start()
+
+    def start(self):
+        """
+        Returns a new executor whose workers see the current data, with
+        every worker already running.
+        """
+        # Sort the names before the workers start, so that they share them
+        if graph is not None:
+            graph.name_index.build()
+        else:
+            degrees.name_index.build()
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            gc.freeze()
+            executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("fork"),
+                initializer=close_sockets
+            )
+        else:
+            executor = ProcessPoolExecutor(
+                self.workers, initializer=load,
+                initargs=(self.directory, self.compact)
+            )
+        # Workers start on demand; one call each starts them all now
+        for future in [executor.submit(ready) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def restart(self):
+        """
+        Replaces the workers with new ones that see the data as updated
+        in this process since they started. Without fork, the new
+        workers load the directory instead, so the updates must have
+        been written to its delta log. Work already submitted still
+        runs on the old workers, which then exit.
+        """
+        old = self.executor
+        self.executor = self.start()
+        old.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        gc.unfreeze()
+
+    def submit(self, source, targets):
+        """
+        Schedules one group and returns a future for (source, paths).
+        """
+        return self.executor.submit(search_group, source, list(targets))
+
+    def map(self, groups, ordered=True):
+        """
+        Yields (source, paths) for every (source, targets) group, in the
+        order of groups if ordered and as soon as each one finishes
+        otherwise.
+        """
+        futures = [self.submit(source, targets) for source, targets in groups]
+        return self.results(futures, ordered)
+
+    def imap(self, function, arguments, ordered=True):
+        """
+        Yields function(graph, *args) for every args in arguments, run
+        in the workers against their shared graph. function must be
+        defined at module level so it can be sent to them.
+        """
+        futures = [self.call(function, args) for args in arguments]
+        return self.results(futures, ordered)
+
+    def call(self, function, arguments):
+        """
+        Schedules function(graph, *arguments) in a worker and returns a
+        future for its result.
+        """
+        return self.executor.submit(call, function, tuple(arguments))
+
+    def results(self, futures, ordered):
+        if ordered:
+            for future in futures:
+                yield future.result()
+        else:
+            for future in as_completed(futures):
+                yield future.result()
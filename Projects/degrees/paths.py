@@ -0,0 +1,198 @@
+"""
+Enumerates every shortest path between two people, or the k best.
+
+One layered breadth-first search from the source records, for each
+person up to the target's depth, every (movie, person) step that reaches
+them from the previous layer. Pruned to the people that lead to the
+target, this is a DAG holding exactly the shortest paths, from which
+paths are generated lazily instead of by searching again.
+
+Hubs can make the number of shortest paths explode, so generators stop
+after limit paths, and max_parents bounds how many incoming steps are
+kept per person (and with it the size of the DAG).
+"""
+
+import heapq
+from collections import deque
+
+import degrees
+
+
+def layered_parents(source, target, neighbors, max_parents=None):
+    """
+    Returns a dict mapping each person on a shortest path from source to
+    target to the list of its (action, parent) steps, or None if target
+    cannot be reached. source maps to an empty list.
+    """
+    parents = {source: []}
+    depth = {source: 0}
+    layer = [source]
+    while layer and target not in depth:
+        next_layer = []
+        for state in layer:
+            for action, child in neighbors(state):
+                if child not in depth:
+                    depth[child] = depth[state] + 1
+                    parents[child] = []
+                    next_layer.append(child)
+                if depth[child] == depth[state] + 1 and (
+                    max_parents is None or len(parents[child]) < max_parents
+                ):
+                    parents[child].append((action, state))
+        layer = next_layer
+    if target not in depth:
+        return None
+
+    # Keep only the people the target's steps lead back to
+    dag = {}
+    pending = deque([target])
+    while pending:
+        state = pending.popleft()
+        if state in dag:
+            continue
+        dag[state] = parents[state]
+        for _, parent in parents[state]:
+            if parent not in dag:
+                pending.append(parent)
+    return dag
+
+
+def enumerate_paths(dag, source, target, limit=None):
+    """
+    Yields up to limit lists of (action, state) pairs from source to
+    target through dag, walking back from the target depth first.
+    """
+    if target == source:
+        yield []
+        return
+    count = 0
+    suffix = []
+    stack = [iter(dag[target])]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            if suffix:
+                suffix.pop()
+            continue
+        action, parent = step
+        state = target if not suffix else suffix[-1][2]
+        suffix.append((action, state, parent))
+        if parent == source:
+            yield [(action, state) for action, state, _ in reversed(suffix)]
+            count += 1
+            if limit is not None and count >= limit:
+                return
+            suffix.pop()
+        else:
+            stack.append(iter(dag[parent]))
+
+
+def best_paths(dag, source, target, cost, limit=None):
+    """
+    Yields up to limit lists of (action, state) pairs from source to
+    target through dag, cheapest first, where a path costs the sum of
+    cost(action, state) over its steps.
+    """
+    children = {state: [] for state in dag}
+    for state, steps in dag.items():
+        for action, parent in steps:
+            children[parent].append((action, state))
+
+    # Cheapest cost from each state to the target, as an exact heuristic
+    remaining = {target: 0}
+    order = deque([target])
+    while order:
+        state = order.popleft()
+        for action, parent in dag[state]:
+            total = remaining[state] + cost(action, state)
+            if parent not in remaining:
+                order.append(parent)
+                remaining[parent] = total
+            elif total < remaining[parent]:
+                remaining[parent] = total
+
+    count = 0
+    counter = 0
+    heap = [(remaining[source], counter, 0, source, ())]
+    while heap:
+        _, _, spent, state, prefix = heapq.heappop(heap)
+        if state == target:
+            yield list(prefix)
+            count += 1
+            if limit is not None and count >= limit:
+                return
+            continue
+        for action, child in children[state]:
+            counter += 1
+            step_cost = spent + cost(action, child)
+            heapq.heappush(heap, (step_cost + remaining[child], counter,
+                                  step_cost, child,
+                                  prefix + ((action, child),)))
+
+
+def year_cost(graph=None):
+    """Returns a step cost that prefers more recent movies."""
+    def year(value):
+        return int(value) if value.isdigit() else 0
+    if graph is not None:
+        return lambda m, p: -year(graph.movie_row(m)[2])
+    return lambda movie_id, person_id: -year(degrees.movies[movie_id]["year"])
+
+
+def popularity_cost(graph=None):
+    """Returns a step cost that prefers people who starred in more movies."""
+    if graph is not None:
+        return lambda m, p: -graph.movie_count(p)
+    return lambda movie_id, person_id: -len(degrees.people[person_id]["movies"])
+
+
+COSTS = {
+    "year": year_cost,
+    "popularity": popularity_cost,
+}
+
+
+def all_shortest_paths(source, target, graph=None, limit=1000,
+                       max_parents=None):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs from
+    source to target, at most limit of them. Yields nothing if they are
+    not connected.
+    """
+    if graph is not None:
+        s, t = graph.index_of(source), graph.index_of(target)
+        dag = layered_parents(s, t, graph.neighbors, max_parents)
+        if dag is not None:
+            for path in enumerate_paths(dag, s, t, limit):
+                yield graph.translate(path)
+        return
+    dag = layered_parents(source, target, degrees.neighbors_for_person,
+                          max_parents)
+    if dag is not None:
+        yield from enumerate_paths(dag, source, target, limit)
+
+
+def k_best_paths(source, target, k=10, rank="year", graph=None,
+                 max_parents=None):
+    """
+    Yields up to k shortest lists of (movie_id, person_id) pairs from
+    source to target, best first.
+
+    rank is "year" (most recent movies first), "popularity" (people
+    with the most movies first) or a function cost(movie, person),
+    summed over a path's steps, lower is better; with a graph it
+    receives interned integers.
+    """
+    cost = COSTS[rank](graph) if isinstance(rank, str) else rank
+    if graph is not None:
+        s, t = graph.index_of(source), graph.index_of(target)
+        dag = layered_parents(s, t, graph.neighbors, max_parents)
+        if dag is not None:
+            for path in best_paths(dag, s, t, cost, k):
+                yield graph.translate(path)
+        return
+    dag = layered_parents(source, target, degrees.neighbors_for_person,
+                          max_parents)
+    if dag is not None:
+        yield from best_paths(dag, source, target, cost, k)
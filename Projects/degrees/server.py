@@ -0,0 +1,369 @@
+"""
+Local HTTP query service for degrees.
+
+The graph is loaded once, as a CompactGraph, and kept in memory. Exact
+name lookups are cheap and answered on the event loop; fuzzy lookups
+and searches run in a QueryPool of worker processes that share the
+graph, so a slow one never blocks other requests. Each has a timeout,
+which the worker also stops searching at, and every search has a cap on
+the number of people it may expand.
+
+Endpoints, all GET, answering JSON:
+
+    /names?prefix=TEXT[&limit=N]            names starting with TEXT
+    /people?name=NAME[&fuzzy=N]             people called NAME, or within
+                                            N (at most 2) edits of it
+    /path?source=A&target=B                 a shortest path from A to B
+    /distance?source=A&target=B             degrees of separation
+
+People are given by IMDb id or by name. The service only reads the
+files in its directory and listens on the loopback interface unless
+told otherwise. It follows the delta log of the directory: records
+appended to it, as by updates.py, are applied to the graph and the
+landmarks, and the workers restarted, while requests keep being served.
+On SIGINT or SIGTERM it stops listening, closes its connections and
+shuts its workers down before exiting.
+
+Usage: python server.py [directory] [--host HOST] [--port PORT]
+                        [--workers N] [--timeout SECONDS]
+                        [--max-expanded N] [--follow SECONDS]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+from batch import resolve
+from instrument import SearchLimitExceeded, SearchStats, SearchTimedOut
+from landmarks import LANDMARKS_NAME, LandmarkOracle
+from parallel import QueryPool
+from updates import LogFollower, Updater
+
+# Most edits /people may allow, and most names /names may return
+MAX_FUZZY = 2
+MAX_NAMES = 1000
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+    504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def find_path(graph, source, target, max_expanded=None, deadline=None):
+    """
+    Returns (path, expanded): a shortest path between two person_ids and
+    the number of people expanded to find it. Runs in a worker, and
+    gives up once deadline, a time.time() value, has passed.
+    """
+    stats = SearchStats(max_expanded=max_expanded, deadline=deadline)
+    path = degrees.bidirectional_shortest_path(source, target, graph, stats)
+    return path, stats.expanded
+
+
+def find_similar(graph, name, max_distance):
+    """
+    Returns the person_ids of the people whose names are within
+    max_distance edits of name. Runs in a worker.
+    """
+    person_ids = []
+    for _, match in degrees.names_like(name, max_distance, graph):
+        person_ids.extend(degrees.person_ids_for_name(match, graph))
+    return person_ids
+
+
+class DegreesService():
+    """
+    Answers the endpoints above for one loaded graph.
+    """
+
+    def __init__(self, pool, oracle=None, timeout=10.0, max_expanded=None):
+        self.pool = pool
+        self.graph = pool.graph
+        self.oracle = oracle
+        self.timeout = timeout
+        self.max_expanded = max_expanded
+        # Tasks serving open connections, with their writers
+        self.connections = {}
+        self.routes = {
+            "/names": self.names,
+            "/people": self.people,
+            "/path": self.path,
+            "/distance": self.distance,
+        }
+
+    async def handle(self, method, target):
+        """Returns (status, body) for one request."""
+        if method != "GET":
+            return 405, {"error": "only GET is supported"}
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, {"error": f"no such endpoint: {url.path}"}
+        query = {key: values[-1]
+                 for key, values in parse_qs(url.query).items()}
+        try:
+            return 200, await route(query)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+
+    def parameter(self, query, name, convert=str, default=None):
+        if name not in query:
+            if default is None:
+                raise HTTPError(400, f"missing parameter: {name}")
+            return default
+        try:
+            return convert(query[name])
+        except ValueError:
+            raise HTTPError(400, f"bad value for {name}: {query[name]}")
+
+    def person(self, person_id):
+        _, name, birth = self.graph.person_row(self.graph.index_of(person_id))
+        return {"id": person_id, "name": name, "birth": birth}
+
+    def resolve(self, text):
+        try:
+            return resolve(text, self.graph)
+        except ValueError as e:
+            raise HTTPError(404, str(e))
+
+    async def names(self, query):
+        prefix = self.parameter(query, "prefix")
+        limit = min(max(self.parameter(query, "limit", int, 20), 0),
+                    MAX_NAMES)
+        return {"names": degrees.names_with_prefix(prefix, self.graph, limit)}
+
+    async def people(self, query):
+        name = self.parameter(query, "name")
+        fuzzy = min(max(self.parameter(query, "fuzzy", int, 0), 0),
+                    MAX_FUZZY)
+        person_ids = degrees.person_ids_for_name(name, self.graph)
+        if not person_ids and fuzzy:
+            person_ids = await self.run(find_similar, (name, fuzzy))
+        return {"people": [self.person(person_id)
+                           for person_id in person_ids]}
+
+    async def run(self, function, arguments):
+        """
+        Returns function(graph, *arguments), run in the pool, within the
+        timeout. A future still queued is cancelled at the timeout; one
+        already running is not, so functions that may run long must
+        stop at the deadline themselves.
+        """
+        future = self.pool.call(function, arguments)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future),
+                                          self.timeout)
+        except (asyncio.TimeoutError, SearchTimedOut):
+            future.cancel()
+            raise HTTPError(504, f"search took over {self.timeout} seconds")
+        except SearchLimitExceeded as e:
+            raise HTTPError(422, str(e))
+
+    async def search(self, source, target):
+        """
+        Runs find_path in the pool, within the timeout. Returns
+        (path, expanded).
+        """
+        deadline = time.time() + self.timeout
+        return await self.run(find_path, (source, target, self.max_expanded,
+                                          deadline))
+
+    async def path(self, query):
+        source = self.resolve(self.parameter(query, "source"))
+        target = self.resolve(self.parameter(query, "target"))
+        path, expanded = await self.search(source, target)
+        steps = None
+        if path is not None:
+            steps = []
+            for movie_id, person_id in path:
+                movie = self.graph.movie_row(self.graph.movie_index_of(movie_id))
+                steps.append({"movie": {"id": movie_id, "title": movie[1],
+                                        "year": movie[2]},
+                              "person": self.person(person_id)})
+        return {
+            "source": self.person(source),
+            "target": self.person(target),
+            "degrees": None if path is None else len(path),
+            "path": steps,
+            "expanded": expanded,
+        }
+
+    async def distance(self, query):
+        source = self.resolve(self.parameter(query, "source"))
+        target = self.resolve(self.parameter(query, "target"))
+        result = {"source": source, "target": target}
+
+        # Landmarks settle some queries without a search
+        if self.oracle is not None:
+            bounds = self.oracle.distance_bounds(source, target)
+            if bounds is None or bounds[0] == bounds[1]:
+                result["degrees"] = None if bounds is None else bounds[0]
+                result["expanded"] = 0
+                return result
+            result["bounds"] = list(bounds)
+
+        path, expanded = await self.search(source, target)
+        result["degrees"] = None if path is None else len(path)
+        result["expanded"] = expanded
+        return result
+
+    async def serve_connection(self, reader, writer):
+        """
+        Answers requests on one connection until the client closes it or
+        asks to, or sends something that is not HTTP.
+        """
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                if len(parts) != 3:
+                    status, body = 400, {"error": "malformed request line"}
+                else:
+                    try:
+                        status, body = await self.handle(parts[0], parts[1])
+                    except Exception as e:
+                        status, body = 500, {"error": repr(e)}
+
+                keep_alive = (len(parts) == 3 and parts[2] == "HTTP/1.1"
+                              and headers.get("connection", "") != "close")
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}"
+                    f"\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            del self.connections[asyncio.current_task()]
+            writer.close()
+
+    async def close_connections(self):
+        """
+        Closes every open connection and waits for the tasks serving them
+        to end.
+        """
+        tasks = list(self.connections)
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def load_oracle(graph, directory):
+    """
+    Returns the LandmarkOracle saved in directory, or None if there is
+    none for this graph.
+    """
+    try:
+        return LandmarkOracle.load(graph, os.path.join(directory,
+                                                       LANDMARKS_NAME))
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+async def follow(follower, updater, interval):
+    """Applies new delta log records every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        report = follower.poll(updater)
+        if report is not None:
+            print(f"Applied updates: {json.dumps(report)}", file=sys.stderr)
+
+
+async def serve(service, host, port, follower=None, interval=None):
+    """
+    Serves requests until SIGINT or SIGTERM, then stops listening and
+    returns, so the caller can close the pool.
+    """
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+        except (NotImplementedError, AttributeError):
+            pass
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving on http://{address[0]}:{address[1]}", file=sys.stderr)
+    if follower is not None:
+        updater = Updater(service.graph, oracle=service.oracle,
+                          pool=service.pool)
+        asyncio.create_task(follow(follower, updater, interval))
+    async with server:
+        await stopping.wait()
+        await service.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python server.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="number of worker processes (0 for one per CPU)")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds a search may take")
+    parser.add_argument("--max-expanded", type=int, default=1000000,
+                        help="people a search may expand")
+    parser.add_argument("--follow", type=float, default=5.0,
+                        metavar="SECONDS",
+                        help="how often to apply new delta log records "
+                             "(0 to never)")
+    args = parser.parse_args()
+
+    follower = LogFollower(args.directory) if args.follow > 0 else None
+    print("Loading data...", file=sys.stderr)
+    with QueryPool(args.directory, compact=True,
+                   workers=args.workers or None) as pool:
+        oracle = load_oracle(pool.graph, args.directory)
+        print("Data loaded" + (" with landmarks." if oracle else "."),
+              file=sys.stderr)
+        service = DegreesService(pool, oracle, args.timeout,
+                                 args.max_expanded)
+        try:
+            asyncio.run(serve(service, args.host, args.port, follower,
+                              args.follow))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
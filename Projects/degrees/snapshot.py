@@ -0,0 +1,181 @@
+"""
+Binary snapshots of a CompactGraph.
+
+A snapshot holds every array of a CompactGraph back to back in one file,
+so loading it is a matter of memory-mapping the file and casting slices
+of it to typed views: nothing is parsed or copied, and only the pages a
+query touches are read from disk.
+
+Usage: python snapshot.py [directory]
+"""
+
+import mmap
+import os
+import struct
+import sys
+
+from graph import CompactGraph, StringTable
+from ingest import replay_delta
+
+SNAPSHOT_NAME = "degrees.snapshot"
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+
+# Magic, version, byte order (0 little, 1 big), number of sections
+HEADER = struct.Struct("<8sIII")
+
+# Section name, typecode, offset, length in bytes
+SECTION = struct.Struct("<24s1s7xQQ")
+
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+TABLES = ("person_ids", "person_names", "person_keys", "person_births",
+          "movie_ids", "movie_titles", "movie_years")
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def sections(graph):
+    """
+    Returns (name, typecode, buffer) for every array in graph.
+    """
+    result = [(name, memoryview(getattr(graph, name)).format,
+               getattr(graph, name))
+              for name in ARRAYS]
+    for name in TABLES:
+        table = getattr(graph, name)
+        result.append((f"{name}.data", "B", table.data))
+        result.append((f"{name}.offsets", "q", table.offsets))
+        if table.order is not None:
+            result.append((f"{name}.order", "i", table.order))
+    return result
+
+
+def write_snapshot(graph, path):
+    """
+    Writes graph to path, replacing any existing snapshot atomically.
+    """
+    parts = sections(graph)
+    offset = HEADER.size + SECTION.size * len(parts)
+    table = []
+    for name, typecode, buffer in parts:
+        offset += -offset % 8
+        size = memoryview(buffer).nbytes
+        table.append((name, typecode, offset, size))
+        offset += size
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "big",
+                            len(parts)))
+        for name, typecode, offset, size in table:
+            f.write(SECTION.pack(name.encode("ascii"),
+                                 typecode.encode("ascii"), offset, size))
+        for (_, _, buffer), (_, _, offset, _) in zip(parts, table):
+            f.write(bytes(offset - f.tell()))
+            f.write(memoryview(buffer).cast("B"))
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    """
+    Memory-maps the snapshot at path and returns a CompactGraph whose
+    arrays are views into the mapping.
+
+    Raises ValueError if the file is not a snapshot this version of the
+    code can read.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError("snapshot is truncated")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+
+    magic, version, big_endian, count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("not a degrees snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if big_endian != (sys.byteorder == "big"):
+        raise ValueError("snapshot was written on a different byte order")
+
+    views = {}
+    for i in range(count):
+        name, typecode, offset, size = SECTION.unpack_from(
+            view, HEADER.size + i * SECTION.size
+        )
+        if offset + size > len(view):
+            raise ValueError("snapshot is truncated")
+        name = name.rstrip(b"\0").decode("ascii")
+        views[name] = view[offset:offset + size].cast(typecode.decode())
+
+    try:
+        arrays = {name: views[name] for name in ARRAYS}
+        for name in TABLES:
+            arrays[name] = StringTable(views[f"{name}.data"],
+                                       views[f"{name}.offsets"],
+                                       views.get(f"{name}.order"))
+    except KeyError as e:
+        raise ValueError(f"snapshot is missing section {e}")
+    return CompactGraph(**arrays)
+
+
+def is_fresh(directory):
+    """
+    Returns True if directory has a snapshot at least as new as its CSVs.
+    """
+    try:
+        built = os.path.getmtime(snapshot_path(directory))
+    except OSError:
+        return False
+    return all(os.path.getmtime(os.path.join(directory, name)) <= built
+               for name in CSV_FILES
+               if os.path.exists(os.path.join(directory, name)))
+
+
+def compile_snapshot(directory):
+    """
+    Parses the CSVs in directory and writes their snapshot next to them.
+    Returns the graph.
+    """
+    graph = CompactGraph.from_csv(directory)
+    write_snapshot(graph, snapshot_path(directory))
+    return graph
+
+
+def load_graph(directory, report=None):
+    """
+    Returns a CompactGraph for directory, memory-mapping its snapshot if
+    it is fresh and readable and parsing the CSVs otherwise, with the
+    records of its delta log applied on top. If report is a dict, the
+    delta records applied and skipped are counted in it, as by
+    ingest.replay_delta.
+    """
+    graph = None
+    if is_fresh(directory):
+        try:
+            graph = read_snapshot(snapshot_path(directory))
+        except (OSError, ValueError, struct.error):
+            pass
+    if graph is None:
+        graph = CompactGraph.from_csv(directory)
+
+    # Replay updates made since the CSVs were written
+    replay_delta(directory, graph.apply, {} if report is None else report)
+    return graph
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python snapshot.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    print("Compiling snapshot...")
+    graph = compile_snapshot(directory)
+    print(f"Wrote {len(graph)} people to {snapshot_path(directory)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Graph-wide separation statistics over a CompactGraph.
+
+For each source person, one breadth-first search gives the distance
+("Bacon number") to every person at once. Sources are spread over a
+QueryPool, so several searches run in parallel against the same shared
+graph. The job can also label connected components and report their
+sizes.
+
+For every source, a summary (people reached, eccentricity, distance
+histogram) is printed as one JSON line, and the distances are written
+to OUTPUT/<person_id>.csv (person_id,distance) or, with --format
+binary, to OUTPUT/<person_id>.bin as one int16 per person in graph
+order, -1 for people who cannot be reached.
+
+Usage: python stats.py [directory] --source NAME_OR_ID [--source ...]
+                       [--output DIR] [--format csv|binary]
+                       [--workers N] [--components]
+"""
+
+import argparse
+import json
+import os
+import sys
+from array import array
+
+import degrees
+from landmarks import UNREACHED, distances_from
+from parallel import QueryPool
+
+
+def histogram(distances):
+    """
+    Returns a list whose i-th entry is the number of people at distance
+    i, and the number of people who cannot be reached.
+    """
+    counts = []
+    unreached = 0
+    for d in distances:
+        if d == UNREACHED:
+            unreached += 1
+            continue
+        while len(counts) <= d:
+            counts.append(0)
+        counts[d] += 1
+    return counts, unreached
+
+
+def write_distances(graph, distances, path, format="csv"):
+    if format == "binary":
+        with open(path, "wb") as f:
+            distances.tofile(f)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("person_id,distance\n")
+        for p, d in enumerate(distances):
+            if d != UNREACHED:
+                f.write(f"{graph.person_id_at(p)},{d}\n")
+
+
+def source_stats(graph, source, output=None, format="csv"):
+    """
+    Runs one breadth-first search from the interned person source and
+    returns its summary, writing the distances under output if given.
+    """
+    distances = distances_from(graph, source)
+    counts, unreached = histogram(distances)
+    person_id = graph.person_id_at(source)
+    if output is not None:
+        extension = "bin" if format == "binary" else "csv"
+        write_distances(graph, distances,
+                        os.path.join(output, f"{person_id}.{extension}"),
+                        format)
+    return {
+        "source": person_id,
+        "reached": len(distances) - unreached,
+        "eccentricity": len(counts) - 1,
+        "histogram": counts,
+    }
+
+
+def components(graph):
+    """
+    Returns (labels, sizes): the component number of every person and
+    the size of every component, largest first.
+    """
+    labels = array("i", [-1]) * len(graph)
+    sizes = []
+    for start in range(len(graph)):
+        if labels[start] != -1:
+            continue
+        label = len(sizes)
+        labels[start] = label
+        frontier = [start]
+        size = 0
+        while frontier:
+            size += len(frontier)
+            next_frontier = []
+            for p in frontier:
+                for _, q in graph.neighbors(p):
+                    if labels[q] == -1:
+                        labels[q] = label
+                        next_frontier.append(q)
+            frontier = next_frontier
+        sizes.append(size)
+
+    # Renumber so that component 0 is the largest
+    order = sorted(range(len(sizes)), key=lambda label: -sizes[label])
+    rank = array("i", [0]) * len(sizes)
+    for new, old in enumerate(order):
+        rank[old] = new
+    for p in range(len(labels)):
+        labels[p] = rank[labels[p]]
+    return labels, [sizes[label] for label in order]
+
+
+def component_summary(graph, top=10):
+    labels, sizes = components(graph)
+    counts = {}
+    for size in sizes:
+        counts[size] = counts.get(size, 0) + 1
+    return {
+        "components": len(sizes),
+        "largest": sizes[:top],
+        "size_histogram": {str(size): counts[size]
+                           for size in sorted(counts)},
+    }
+
+
+def resolve_source(graph, text):
+    """Returns the interned person for an IMDb id or a name."""
+    try:
+        return graph.index_of(text)
+    except KeyError:
+        pass
+    person_id = degrees.find_person_id(text, graph=graph)
+    if person_id is None:
+        sys.exit(f"Person not found: {text}")
+    return graph.index_of(person_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python stats.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--source", action="append", default=[],
+                        help="person to compute distances from; repeatable")
+    parser.add_argument("--output", help="directory for distance files")
+    parser.add_argument("--format", choices=["csv", "binary"], default="csv")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="number of worker processes (0 for one per CPU)")
+    parser.add_argument("--components", action="store_true",
+                        help="report connected component sizes")
+    args = parser.parse_args()
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    print("Loading data...", file=sys.stderr)
+    with QueryPool(args.directory, compact=True,
+                   workers=args.workers or None) as pool:
+        graph = pool.graph
+        print("Data loaded.", file=sys.stderr)
+
+        sources = [resolve_source(graph, text) for text in args.source]
+        jobs = [(source, args.output, args.format) for source in sources]
+        for summary in pool.imap(source_stats, jobs, ordered=False):
+            print(json.dumps(summary))
+
+        if args.components:
+            print(json.dumps(component_summary(graph)))
+
+
+if __name__ == "__main__":
+    main()
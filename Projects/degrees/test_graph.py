@@ -0,0 +1,56 @@
+"""
+Tests for people added to a CompactGraph after it was built.
+
+Run with: python -m unittest test_graph
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import degrees
+from cache import PathCache
+from ingest import DELTA_NAME
+from snapshot import load_graph
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+NEW_PERSON = {"type": "person", "id": "999", "name": "New Person"}
+
+
+class AddedPersonTest(unittest.TestCase):
+
+    def check_unconnected(self, graph):
+        self.assertEqual(graph.neighbors_for_person("999"), set())
+        self.assertIsNone(degrees.shortest_path("999", "102", graph))
+        self.assertIsNone(degrees.shortest_path("102", "999", graph))
+        self.assertIsNone(
+            degrees.bidirectional_shortest_path("999", "102", graph))
+        self.assertIsNone(PathCache(graph).shortest_path("999", "102"))
+
+    def test_person_without_movies(self):
+        graph = load_graph(SMALL)
+        self.assertTrue(graph.apply(NEW_PERSON))
+        self.check_unconnected(graph)
+
+    def test_person_without_movies_from_delta_log(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for name in ("people.csv", "movies.csv", "stars.csv"):
+            shutil.copy(os.path.join(SMALL, name), directory)
+        with open(os.path.join(directory, DELTA_NAME), "w") as log:
+            log.write(json.dumps(NEW_PERSON) + "\n")
+        self.check_unconnected(load_graph(directory))
+
+    def test_person_with_movie(self):
+        graph = load_graph(SMALL)
+        graph.apply(NEW_PERSON)
+        graph.apply({"type": "star", "person_id": "999",
+                     "movie_id": "112384"})
+        path = degrees.shortest_path("999", "102", graph)
+        self.assertEqual(path, [("112384", "102")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Incremental updates to loaded degrees data.
+
+New people, movies and star edges are applied to the data in place,
+either the dicts of degrees.py or a CompactGraph, instead of reloading
+the CSVs. Each applied record is appended to the delta log of the
+directory (see ingest.py), so that later loads replay it on top of the
+CSVs or their snapshot. Only the cached paths and landmark distances
+that a new star edge could change are touched.
+
+Worker processes of a QueryPool hold their own copy of the data, so an
+Updater given the pool restarts its workers after a batch of records
+changed the data. A running server.py follows the delta log the same
+way: records this script appends to it are applied to the server's
+graph within a few seconds, without stopping it.
+
+Records are JSON objects, one per line:
+
+    {"type": "person", "id": ..., "name": ..., "birth": ...}
+    {"type": "movie", "id": ..., "title": ..., "year": ...}
+    {"type": "star", "person_id": ..., "movie_id": ...}
+
+Usage: python updates.py [directory] [--input FILE]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import degrees
+from ingest import DELTA_NAME
+from snapshot import load_graph
+
+
+class Updater():
+    """
+    Applies delta records to the data that queries are being served
+    from, keeping a PathCache and a LandmarkOracle over it consistent.
+
+    graph is the CompactGraph being served, or None for the dicts in
+    degrees.py. If log is a writable text file, every record that
+    changed the data is appended to it. If pool is the QueryPool
+    serving the data, apply_all restarts its workers once it has
+    changed the data, so that they see the update.
+    """
+
+    def __init__(self, graph=None, cache=None, oracle=None, log=None,
+                 pool=None):
+        self.graph = graph
+        self.cache = cache
+        self.oracle = oracle
+        self.log = log
+        self.pool = pool
+
+    def apply(self, record):
+        """
+        Applies one record and returns True if it changed the data.
+        Raises ValueError for a malformed record and KeyError for a star
+        whose person or movie is unknown.
+        """
+        if not degrees.apply_update(record, self.graph):
+            return False
+        if record["type"] == "person" and self.oracle is not None:
+            self.oracle.add_person()
+        if record["type"] == "star":
+            person_id, movie_id = record["person_id"], record["movie_id"]
+            if self.cache is not None:
+                self.cache.invalidate_star(person_id, movie_id)
+            if self.oracle is not None:
+                graph = self.oracle.graph
+                self.oracle.add_star(graph.index_of(person_id),
+                                     graph.movie_index_of(movie_id))
+        if self.log is not None:
+            self.log.write(json.dumps(record) + "\n")
+        return True
+
+    def apply_all(self, records):
+        """
+        Applies every record in order, skipping those that fail, then
+        restarts the workers of the pool if any record changed the data.
+        Returns a dict of counts and the errors, by record number.
+        """
+        report = {"applied": 0, "unchanged": 0, "errors": []}
+        for number, record in enumerate(records, 1):
+            try:
+                changed = self.apply(record)
+            except KeyError as e:
+                report["errors"].append({"record": number,
+                                         "error": f"unknown id: {e.args[0]}"})
+                continue
+            except ValueError as e:
+                report["errors"].append({"record": number, "error": str(e)})
+                continue
+            report["applied" if changed else "unchanged"] += 1
+        if self.log is not None:
+            self.log.flush()
+        if self.pool is not None and report["applied"]:
+            self.pool.restart()
+        return report
+
+
+class LogFollower():
+    """
+    Reads the records appended to the delta log of a directory since it
+    was last read, starting from its end when the follower is made.
+
+    Make it before loading the data, so that records appended during the
+    load are not missed; applying a record twice changes nothing.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, DELTA_NAME)
+        self.offset = self.size()
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def poll(self, updater):
+        """
+        Applies the complete lines appended since the last poll with
+        updater, and returns its report, or None if there were none.
+        """
+        size = self.size()
+        if size < self.offset:
+            # The log was replaced; its records are not new
+            self.offset = size
+        if size == self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return None
+        self.offset += end
+        lines = data[:end].decode("utf-8", errors="replace").splitlines()
+        return updater.apply_all(read_records(lines))
+
+
+def read_records(lines):
+    """
+    Yields the JSON record on each non-blank line. Lines that are not
+    valid JSON yield their text, which Updater.apply reports as a
+    malformed record.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python updates.py [directory] [--input FILE]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", help="records to apply (default: stdin)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = load_graph(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    log_path = os.path.join(args.directory, DELTA_NAME)
+    with source, open(log_path, "a", encoding="utf-8") as log:
+        start = time.perf_counter()
+        report = Updater(graph, log=log).apply_all(read_records(source))
+        report["seconds"] = time.perf_counter() - start
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Times model_check methods on the puzzles in puzzle.py and on random
+knights-and-knaves puzzles, and checks that every method agrees.
+
+For each knowledge base, every symbol is queried, as puzzle.py does:
+one model_check call per symbol, or for the methods named "kb:..." one
+batch to a KnowledgeBase.
+For "recursive" and "pruning", the number of models visited is shown too.
+Methods are skipped on knowledge bases with more symbols than their
+limit, since plain enumeration doubles in cost with every symbol.
+
+Usage: python benchmark.py [--sizes N ...] [--methods METHOD ...]
+                           [--max-symbols METHOD=N ...]
+"""
+
+import argparse
+import time
+
+import puzzle
+from generator import knights_and_knaves
+from knowledge import KnowledgeBase
+from logic import model_check
+
+# Most symbols each method is run on, unless overridden
+MAX_SYMBOLS = {
+    "recursive": 16,
+    "compiled": 20,
+    "bitwise": 28,
+    "parallel": 24,
+    "pruning": 64,
+    "sat": 2000,
+    "kb:truth_table": 24,
+    "kb:sat": 2000,
+}
+
+
+def knowledge_bases(sizes):
+    """
+    Yields (name, symbols, knowledge) for every benchmark case, with
+    knowledge interned once so every query shares its nodes.
+    """
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    for i in range(4):
+        knowledge = getattr(puzzle, f"knowledge{i}")
+        if knowledge.conjuncts:
+            yield f"Puzzle {i}", symbols, knowledge.intern()
+    for n in sizes:
+        symbols, knowledge = knights_and_knaves(n)
+        yield f"{n} inhabitants", symbols, knowledge.intern()
+
+
+def time_method(method, symbols, knowledge):
+    """
+    Returns (seconds, entailed symbols, models visited or None) for one
+    method.
+    """
+    stats = {}
+    start = time.perf_counter()
+    if method.startswith("kb:"):
+        knowledge_base = KnowledgeBase(knowledge, method=method[3:])
+        entailed = [symbol for symbol, result
+                    in zip(symbols, knowledge_base.entails_all(symbols))
+                    if result]
+    else:
+        entailed = [symbol for symbol in symbols
+                    if model_check(knowledge, symbol, method, stats)]
+    return time.perf_counter() - start, entailed, stats.get("models")
+
+
+def run(sizes, methods, max_symbols):
+    for name, symbols, knowledge in knowledge_bases(sizes):
+        count = len(knowledge.symbols() | {s.name for s in symbols})
+        print(f"{name} ({count} symbols, {len(symbols)} queries)")
+        expected = None
+        baseline = None
+        for method in methods:
+            if count > max_symbols.get(method, count):
+                print(f"    {method:16} skipped")
+                continue
+            seconds, entailed, models = time_method(method, symbols,
+                                                    knowledge)
+            if expected is None:
+                expected = entailed
+                baseline = seconds
+            note = "" if entailed == expected else "  MISMATCH"
+            if models is not None:
+                note = f"  {models:12} models{note}"
+            print(f"    {method:16} {seconds * 1000:10.2f} ms"
+                  f"  {baseline / seconds:8.1f}x{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [options]"
+    )
+    parser.add_argument("--sizes", type=int, nargs="*",
+                        default=[4, 6, 8, 10, 12, 50, 200],
+                        help="numbers of inhabitants of random puzzles")
+    parser.add_argument("--methods", nargs="*", default=list(MAX_SYMBOLS),
+                        help="model_check methods to compare; the first "
+                             "is the baseline")
+    parser.add_argument("--max-symbols", nargs="*", default=[],
+                        metavar="METHOD=N",
+                        help="override the symbol limit of a method")
+    args = parser.parse_args()
+
+    max_symbols = dict(MAX_SYMBOLS)
+    for limit in args.max_symbols:
+        method, _, n = limit.partition("=")
+        max_symbols[method] = int(n)
+    run(args.sizes, args.methods, max_symbols)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Random knights-and-knaves puzzles of any size.
+
+Each of n inhabitants is a knight or a knave, and says one thing about
+the others. A hidden assignment is drawn first and every statement is
+phrased so that knights tell the truth and knaves lie under it, so the
+knowledge base always has at least one model.
+"""
+
+import random
+
+from logic import And, Biconditional, Not, Or, Symbol
+
+
+def inhabitants(n):
+    """Returns (knight, knave) symbol pairs for n inhabitants."""
+    return [(Symbol(f"{i} is a Knight"), Symbol(f"{i} is a Knave"))
+            for i in range(n)]
+
+
+def statement(people, speaker, generator):
+    """
+    Returns a random claim by speaker about one or two other people,
+    as a sentence.
+    """
+    others = [i for i in range(len(people)) if i != speaker] or [speaker]
+    a = generator.choice(others)
+    b = generator.choice(others)
+    kind = generator.randrange(4)
+    if kind == 0:
+        return people[a][1]
+    if kind == 1:
+        return Or(people[a][0], people[b][0])
+    if kind == 2:
+        return Biconditional(people[a][0], people[b][0])
+    return And(people[a][1], Not(people[b][1]))
+
+
+def knights_and_knaves(n, seed=0):
+    """
+    Returns (symbols, knowledge) for a random puzzle with n inhabitants
+    and 2n symbols.
+    """
+    generator = random.Random(seed)
+    people = inhabitants(n)
+    knights = [generator.random() < 0.5 for _ in range(n)]
+    model = {}
+    for (knight, knave), is_knight in zip(people, knights):
+        model[knight.name] = is_knight
+        model[knave.name] = not is_knight
+
+    knowledge = And()
+    for i, (knight, knave) in enumerate(people):
+        # Everybody is exactly one of a knight and a knave
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+        claim = statement(people, i, generator)
+        if claim.evaluate(model) != knights[i]:
+            claim = Not(claim)
+        knowledge.add(Biconditional(knight, claim))
+
+    symbols = [symbol for pair in people for symbol in pair]
+    return symbols, knowledge
@@ -0,0 +1,160 @@
+"""
+Knowledge base that answers many queries without starting over.
+
+model_check gets the knowledge base and the query together, so asking
+about six symbols enumerates the same models six times. A
+KnowledgeBase keeps its work between queries instead, in one of two
+forms:
+
+"sat" keeps one SAT solver holding every sentence, each guarded by an
+activation variable. A query is a solve under the assumption that the
+active sentences hold and the query does not; clauses learned along the
+way stay for later queries. A sentence is retracted by switching its
+activation variable off for good. In a batch, every model found also
+rules out all the other queries that are false in it.
+
+"truth_table" keeps the truth table of every sentence as a bitmask over
+all models of the symbols seen so far (see Sentence.truth_table), and
+their conjunction. Adding a sentence is one AND, retracting one is an
+AND over the tables that remain, and a query is one AND against the
+models. A new symbol doubles every table rather than recomputing it.
+It suits knowledge bases of up to about 25 symbols.
+"""
+
+from logic import And, Sentence
+from sat import Encoder
+
+METHODS = ("sat", "truth_table")
+
+
+class KnowledgeBase():
+    """
+    A conjunction of sentences that answers entailment queries, and to
+    which sentences can be added and from which they can be retracted.
+    """
+
+    def __init__(self, *sentences, method="sat"):
+        if method not in METHODS:
+            raise ValueError(f"unknown knowledge base method: {method}")
+        self.method = method
+        self.sentences = []
+
+        # For "sat", the activation variable of each sentence
+        self.encoder = Encoder()
+        self.selectors = []
+
+        # For "truth_table", the truth table of each sentence
+        self.symbols = []
+        self.columns = {}
+        self.full = 1
+        self.tables = []
+        self.models = self.full
+
+        for sentence in sentences:
+            self.add(sentence)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def knowledge(self):
+        """Returns the knowledge base as one sentence."""
+        return And(*self.sentences)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        sentence = sentence.intern()
+        if self.method == "sat":
+            selector = self.encoder.solver.new_variable()
+            literal = self.encoder.literal(sentence)
+            self.encoder.solver.add_clause([-selector, literal])
+            self.selectors.append(selector)
+        else:
+            table = self.truth_table(sentence)
+            self.tables.append(table)
+            self.models &= table
+        self.sentences.append(sentence)
+
+    def retract(self, sentence):
+        """
+        Removes a sentence that was added, or raises ValueError if
+        there is none equal to it.
+        """
+        i = self.sentences.index(sentence.intern())
+        del self.sentences[i]
+        if self.method == "sat":
+            selector = self.selectors.pop(i)
+            self.encoder.solver.add_clause([-selector])
+        else:
+            del self.tables[i]
+            self.models = self.full
+            for table in self.tables:
+                self.models &= table
+
+    def extend(self, symbols):
+        """
+        Adds columns for symbols not seen yet. Each new symbol doubles
+        the number of models; no sentence depends on it, so every table
+        is repeated once, with the symbol false and then true.
+        """
+        for symbol in sorted(set(symbols) - set(self.columns)):
+            width = 1 << len(self.symbols)
+            for name in self.symbols:
+                self.columns[name] |= self.columns[name] << width
+            self.columns[symbol] = self.full << width
+            self.tables = [table | (table << width) for table in self.tables]
+            self.models |= self.models << width
+            self.full |= self.full << width
+            self.symbols.append(symbol)
+
+    def truth_table(self, sentence):
+        self.extend(sentence.symbols())
+        return sentence.truth_table(self.columns, self.full)
+
+    def satisfiable(self):
+        """Returns True if the knowledge base has a model."""
+        if self.method == "sat":
+            return self.encoder.solver.solve(self.selectors)
+        return self.models != 0
+
+    def count_models(self):
+        """
+        Returns the number of models of the knowledge base over the
+        symbols seen so far. Only for "truth_table".
+        """
+        if self.method != "truth_table":
+            raise ValueError("only a truth table can count models")
+        return bin(self.models).count("1")
+
+    def entails(self, query):
+        """Returns True if the knowledge base entails query."""
+        return self.entails_all([query])[0]
+
+    def entails_all(self, queries):
+        """
+        Returns a list with, for each query, whether the knowledge base
+        entails it.
+        """
+        if self.method == "truth_table":
+            for query in queries:
+                self.extend(query.symbols())
+            return [not self.models & (self.full ^ self.truth_table(query))
+                    for query in queries]
+
+        solver = self.encoder.solver
+        literals = [self.encoder.literal(query) for query in queries]
+        results = [None] * len(queries)
+        for i, literal in enumerate(literals):
+            if results[i] is not None:
+                continue
+            if not solver.solve(self.selectors + [-literal]):
+                results[i] = True
+                continue
+
+            # A model of the knowledge base refutes every query false in it
+            model = solver.model
+            for j in range(i, len(literals)):
+                if results[j] is None and \
+                        model[abs(literals[j])] != (literals[j] > 0):
+                    results[j] = False
+        return results
@@ -1,12 +1,37 @@
 import itertools
+import weakref
+
+# Interned sentences, by ("symbol", name) or by class and operand ids.
+# A sentence is only kept while something else refers to it, but its
+# operands live at least as long, and ids are never reused, so no key
+# can match a sentence it was not made for.
+interned = weakref.WeakValueDictionary()
+interned_ids = itertools.count(1)
+
+# Deepest nesting of a compiled expression before a subexpression is
+# assigned to a variable, well below the limit of the Python parser
+MAX_NESTING = 50
 
 
 class Sentence():
 
+    # Set on interned sentences only: a unique id, the hash and symbols
+    id = None
+    cached_hash = None
+    cached_symbols = None
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def partial_evaluate(self, model):
+        """
+        Evaluates the logical sentence in a partial model, which may
+        lack some symbols. Returns None if the truth value depends on
+        the symbols missing from model.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -15,6 +40,56 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def expression(self, operands, index):
+        """
+        Returns a Python expression evaluating the sentence over a
+        sequence v of truth values, given the expressions of its
+        operands, in the order of operands(), and index mapping each
+        symbol name to its position in v.
+        """
+        raise Exception("nothing to compile")
+
+    def truth_table(self, columns, full):
+        """
+        Returns the truth table of the sentence as a bitmask with one
+        bit per model, given the bitmask of every symbol in columns and
+        full, the bitmask with every model's bit set.
+        """
+        raise Exception("nothing to evaluate")
+
+    def operands(self):
+        """Returns the sentences the logical sentence is built from."""
+        return ()
+
+    def intern(self):
+        """
+        Returns the interned sentence structurally equal to this one.
+
+        Interned sentences are shared and immutable: interning equal
+        sentences gives the same object, which stores its hash, its
+        symbols and a unique integer id, so hashing and comparing
+        interned sentences takes constant time instead of a tree walk.
+        """
+        if self.id is not None:
+            return self
+        operands = [operand.intern() for operand in self.operands()]
+        if isinstance(self, Symbol):
+            key = ("symbol", self.name)
+        else:
+            key = (type(self).__name__,
+                   tuple(operand.id for operand in operands))
+        node = interned.get(key)
+        if node is None:
+            if isinstance(self, Symbol):
+                node = Symbol(self.name)
+            else:
+                node = type(self)(*operands)
+            node.cached_hash = hash(node)
+            node.cached_symbols = frozenset(node.symbols())
+            node.id = next(interned_ids)
+            interned[key] = node
+        return node
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -62,12 +137,22 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def partial_evaluate(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
     def symbols(self):
         return {self.name}
 
+    def expression(self, operands, index):
+        return f"v[{index[self.name]}]"
+
+    def truth_table(self, columns, full):
+        return columns[self.name]
+
 
 class Not(Sentence):
     def __init__(self, operand):
@@ -75,9 +160,13 @@ class Not(Sentence):
         self.operand = operand
 
     def __eq__(self, other):
+        if self.id is not None and getattr(other, "id", None) is not None:
+            return self is other
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
+        if self.id is not None:
+            return self.cached_hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -86,12 +175,27 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def partial_evaluate(self, model):
+        value = self.operand.partial_evaluate(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
+    def operands(self):
+        return (self.operand,)
+
     def symbols(self):
+        if self.id is not None:
+            return set(self.cached_symbols)
         return self.operand.symbols()
 
+    def expression(self, operands, index):
+        return f"(not {operands[0]})"
+
+    def truth_table(self, columns, full):
+        return full ^ self.operand.truth_table(columns, full)
+
 
 class And(Sentence):
     def __init__(self, *conjuncts):
@@ -100,9 +204,13 @@ class And(Sentence):
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
+        if self.id is not None and getattr(other, "id", None) is not None:
+            return self is other
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
+        if self.id is not None:
+            return self.cached_hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -115,19 +223,50 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self.id is not None:
+            raise TypeError("interned sentences cannot be changed")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def partial_evaluate(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.partial_evaluate(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
+    def operands(self):
+        return tuple(self.conjuncts)
+
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self.id is not None:
+            return set(self.cached_symbols)
+        return set.union(set(), *[conjunct.symbols()
+                                  for conjunct in self.conjuncts])
+
+    def expression(self, operands, index):
+        if not operands:
+            return "True"
+        return "(" + " and ".join(operands) + ")"
+
+    def truth_table(self, columns, full):
+        table = full
+        for conjunct in self.conjuncts:
+            table &= conjunct.truth_table(columns, full)
+            if not table:
+                break
+        return table
 
 
 class Or(Sentence):
@@ -137,9 +276,13 @@ class Or(Sentence):
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
+        if self.id is not None and getattr(other, "id", None) is not None:
+            return self is other
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
+        if self.id is not None:
+            return self.cached_hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -151,14 +294,43 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def partial_evaluate(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.partial_evaluate(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
+    def operands(self):
+        return tuple(self.disjuncts)
+
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self.id is not None:
+            return set(self.cached_symbols)
+        return set.union(set(), *[disjunct.symbols()
+                                  for disjunct in self.disjuncts])
+
+    def expression(self, operands, index):
+        if not operands:
+            return "False"
+        return "(" + " or ".join(operands) + ")"
+
+    def truth_table(self, columns, full):
+        table = 0
+        for disjunct in self.disjuncts:
+            table |= disjunct.truth_table(columns, full)
+            if table == full:
+                break
+        return table
 
 
 class Implication(Sentence):
@@ -169,11 +341,15 @@ class Implication(Sentence):
         self.consequent = consequent
 
     def __eq__(self, other):
+        if self.id is not None and getattr(other, "id", None) is not None:
+            return self is other
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
     def __hash__(self):
+        if self.id is not None:
+            return self.cached_hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -183,14 +359,38 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def partial_evaluate(self, model):
+        antecedent = self.antecedent.partial_evaluate(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.partial_evaluate(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
+    def operands(self):
+        return (self.antecedent, self.consequent)
+
     def symbols(self):
+        if self.id is not None:
+            return set(self.cached_symbols)
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
+    def expression(self, operands, index):
+        antecedent, consequent = operands
+        return f"(not {antecedent} or {consequent})"
+
+    def truth_table(self, columns, full):
+        return ((full ^ self.antecedent.truth_table(columns, full))
+                | self.consequent.truth_table(columns, full))
+
 
 class Biconditional(Sentence):
     def __init__(self, left, right):
@@ -200,11 +400,15 @@ class Biconditional(Sentence):
         self.right = right
 
     def __eq__(self, other):
+        if self.id is not None and getattr(other, "id", None) is not None:
+            return self is other
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
     def __hash__(self):
+        if self.id is not None:
+            return self.cached_hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -216,23 +420,244 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def partial_evaluate(self, model):
+        left = self.left.partial_evaluate(model)
+        if left is None:
+            return None
+        right = self.right.partial_evaluate(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
+    def operands(self):
+        return (self.left, self.right)
+
     def symbols(self):
+        if self.id is not None:
+            return set(self.cached_symbols)
         return set.union(self.left.symbols(), self.right.symbols())
 
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def expression(self, operands, index):
+        # Each operand is evaluated once, unlike in evaluate
+        left, right = operands
+        return f"({left} == {right})"
+
+    def truth_table(self, columns, full):
+        return full ^ (self.left.truth_table(columns, full)
+                       ^ self.right.truth_table(columns, full))
+
+
+def sentence_code(sentence, symbols):
+    """
+    Returns the source of a function evaluate(v) giving the truth value
+    of sentence over a sequence v of truth values, one per symbol name
+    in symbols, in that order.
+
+    The tree is walked with an explicit stack rather than recursion, so
+    sentences of any depth compile. Operands nested MAX_NESTING deep
+    are not nested further: each is assigned to a variable by a line of
+    its own, evaluated before the expression that uses it.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    lines = []
+    # (expression, nesting) of every finished operand not yet used
+    built = []
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        operands = node.operands()
+        if operands and not expanded:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in reversed(operands))
+            continue
+        first = len(built) - len(operands)
+        expressions = []
+        deepest = 0
+        for expression, nesting in built[first:]:
+            if nesting >= MAX_NESTING:
+                name = f"t{len(lines)}"
+                lines.append(f"{name} = {expression}")
+                expression, nesting = name, 0
+            expressions.append(expression)
+            deepest = max(deepest, nesting)
+        del built[first:]
+        built.append((node.expression(expressions, index), deepest + 1))
+    [(expression, _)] = built
+    lines.append(f"return {expression}")
+    return "def evaluate(v):\n" + "".join(f"    {line}\n" for line in lines)
+
+
+def compile_code(source):
+    """Returns the function defined by source from sentence_code."""
+    namespace = {}
+    exec(source, namespace)
+    return namespace["evaluate"]
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Returns a function that evaluates sentence over a sequence of truth
+    values, one per symbol name in symbols, in that order. The sentence
+    tree is turned into Python code once, so evaluating it does no
+    recursion and no dict lookups.
+    """
+    return compile_code(sentence_code(sentence, symbols))
+
+
+def compiled_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, like model_check, with both
+    compiled and every model enumerated as a tuple of truth values.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    knowledge = compile_sentence(knowledge, symbols)
+    query = compile_sentence(query, symbols)
+    for model in itertools.product((True, False), repeat=len(symbols)):
+        if knowledge(model) and not query(model):
+            return False
+    return True
+
+
+def column(i, width):
+    """
+    Returns the truth table of the i-th of the symbols enumerated over
+    width models: runs of 2**i zero bits and 2**i one bits, repeated.
+    """
+    run = 1 << i
+    table = ((1 << run) - 1) << run
+    length = 2 * run
+    while length < width:
+        table |= table << length
+        length *= 2
+    return table
+
+
+def bitwise_check(knowledge, query, chunk_symbols=20):
+    """
+    Checks if knowledge base entails query, like model_check, with the
+    truth values of the sentences in all models computed at once as
+    Python integers, one bit per model.
+
+    Up to chunk_symbols symbols vary inside one bitmask; the remaining
+    ones are enumerated, with each fixed to all zeros or all ones, so
+    that no bitmask is wider than 2 ** chunk_symbols bits.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    inner = symbols[:chunk_symbols]
+    outer = symbols[chunk_symbols:]
+    width = 1 << len(inner)
+    full = (1 << width) - 1
+    columns = {symbol: column(i, width) for i, symbol in enumerate(inner)}
+    for values in itertools.product((full, 0), repeat=len(outer)):
+        columns.update(zip(outer, values))
+        models = knowledge.truth_table(columns, full)
+        if models and models & ~query.truth_table(columns, full):
+            return False
+    return True
+
+
+def pruning_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, like model_check, assigning
+    one symbol at a time and evaluating the sentences in every partial
+    model on the way. The search looks for a model of every conjunct of
+    knowledge and of the negated query; once one of them is false, no
+    model extending the partial one can be, and that whole subtree is
+    skipped.
+
+    The next symbol comes from the undecided sentence with the fewest
+    symbols left unassigned, the one closest to being decided, and of
+    those the symbol that occurs in the most sentences. If stats is a
+    dict, its "models" entry counts the partial models visited.
+    """
+    constraints = (list(knowledge.conjuncts) if isinstance(knowledge, And)
+                   else [knowledge])
+    constraints.append(Not(query))
+    constraint_symbols = [constraint.symbols() for constraint in constraints]
+    occurrences = {}
+    for symbols in constraint_symbols:
+        for symbol in symbols:
+            occurrences[symbol] = occurrences.get(symbol, 0) + 1
+    model = {}
+    visited = 0
+
+    def search():
+        """Returns False if model extends to a model of every constraint."""
+        nonlocal visited
+        visited += 1
+
+        # Find the undecided constraint with the fewest unassigned symbols
+        unassigned = None
+        for constraint, symbols in zip(constraints, constraint_symbols):
+            value = constraint.partial_evaluate(model)
+            if value is False:
+                return True
+            if value is None:
+                left = [symbol for symbol in symbols if symbol not in model]
+                if unassigned is None or len(left) < len(unassigned):
+                    unassigned = left
+
+        # Knowledge is true and query false, whatever the other symbols
+        if unassigned is None:
+            return False
+
+        p = max(unassigned, key=occurrences.get)
+        for value in (True, False):
+            model[p] = value
+            if not search():
+                return False
+        del model[p]
+        return True
+
+    try:
+        return search()
+    finally:
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + visited
+
+
+def model_check(knowledge, query, method="recursive", stats=None):
+    """
+    Checks if knowledge base entails query.
+
+    method is "recursive", to evaluate the sentence trees in every
+    model, "compiled", to evaluate compiled sentences instead,
+    "bitwise", to evaluate the sentences in all models at once,
+    "parallel", to enumerate models on every CPU, "pruning", to skip
+    the models that partial ones already decide (see pruning_check),
+    or "sat", to search for a model of knowledge and not query with the
+    SAT solver in sat.py.
+
+    For "recursive" and "pruning", if stats is a dict, its "models"
+    entry counts the models visited.
+    """
+    if method == "compiled":
+        return compiled_check(knowledge, query)
+    if method == "bitwise":
+        return bitwise_check(knowledge, query)
+    if method == "sat":
+        from sat import entails
+        return entails(knowledge, query)
+    if method == "parallel":
+        from parallel import parallel_check
+        return parallel_check(knowledge, query)
+    if method == "pruning":
+        return pruning_check(knowledge, query, stats)
+    if method != "recursive":
+        raise ValueError(f"unknown model checking method: {method}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
         # If model has an assignment for each symbol
         if not symbols:
+            if stats is not None:
+                stats["models"] = stats.get("models", 0) + 1
 
             # If knowledge base is true in model, then query must also be true
             if knowledge.evaluate(model):
@@ -0,0 +1,106 @@
+"""
+Model enumeration for model_check spread over a pool of processes.
+
+The models are split into 2**k subspaces by fixing the first k symbols
+in every possible way, and each subspace is enumerated by a worker with
+compiled sentences (see compile_sentence). Workers are sent the
+compiled Python code rather than the sentences, so nothing but strings
+crosses process boundaries, and substitute the fixed truth values into
+it as constants.
+
+The first worker to find a model of the knowledge base in which the
+query is false sets an event shared by the whole pool; every other
+worker checks it regularly and gives up, and subspaces not started yet
+are cancelled.
+"""
+
+import itertools
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from logic import compile_code, sentence_code
+
+# Models a worker enumerates between checks of the stop event
+CHECK_EVERY = 1 << 12
+
+# Set in every worker, once a counter-model has been found anywhere
+stop = None
+
+
+def initialize(event):
+    global stop
+    stop = event
+
+
+def check_subspace(knowledge, query, prefix, remaining):
+    """
+    Enumerates the models whose first truth values are prefix, followed
+    by every assignment of remaining more symbols. knowledge and query
+    are sources from sentence_code.
+
+    Returns False if knowledge is true and query false in one of them,
+    True if there is no such model and None if stopped early.
+    """
+    knowledge = compile_code(fix(knowledge, prefix))
+    query = compile_code(fix(query, prefix))
+    for count, model in enumerate(itertools.product((True, False),
+                                                    repeat=remaining)):
+        if count % CHECK_EVERY == 0 and stop.is_set():
+            return None
+        if knowledge(model) and not query(model):
+            stop.set()
+            return False
+    return True
+
+
+def fix(source, prefix):
+    """
+    Returns source with the first len(prefix) truth values replaced by
+    the constants in prefix and the others renumbered from 0.
+    """
+    def replace(match):
+        i = int(match.group(1))
+        if i < len(prefix):
+            return str(prefix[i])
+        return f"v[{i - len(prefix)}]"
+    return re.sub(r"v\[(\d+)\]", replace, source)
+
+
+def parallel_check(knowledge, query, workers=None, split=None):
+    """
+    Checks if knowledge base entails query, like model_check, with the
+    models enumerated by workers processes in 2**split subspaces. By
+    default there is one worker per CPU and about four subspaces each.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    workers = workers or os.cpu_count() or 1
+    if split is None:
+        split = (4 * workers - 1).bit_length()
+    split = min(split, len(symbols))
+    knowledge = sentence_code(knowledge, symbols)
+    query = sentence_code(query, symbols)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    event = context.Event()
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=initialize,
+                             initargs=(event,)) as executor:
+        futures = [
+            executor.submit(check_subspace, knowledge, query, prefix,
+                            len(symbols) - split)
+            for prefix in itertools.product((True, False), repeat=split)
+        ]
+        try:
+            for future in as_completed(futures):
+                if future.result() is False:
+                    return False
+            return True
+        finally:
+            event.set()
+            for future in futures:
+                future.cancel()
@@ -1,4 +1,5 @@
 from logic import *
+from knowledge import KnowledgeBase
 
 AKnight = Symbol("A is a Knight")
 AKnave = Symbol("A is a Knave")
@@ -53,8 +54,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = KnowledgeBase(knowledge).entails_all(symbols)
+            for symbol, result in zip(symbols, entailed):
+                if result:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,429 @@
+"""
+Entailment by satisfiability.
+
+A knowledge base entails a query exactly when the knowledge base
+together with the negated query has no model. Rather than enumerate
+every model, sentences are converted to conjunctive normal form and
+handed to a CDCL SAT solver.
+
+The conversion is the Tseitin encoding: every connective gets a fresh
+variable constrained to equal it, so the clauses grow linearly with the
+sentence instead of exponentially. Variables are numbered from 1 and a
+literal is a variable or its negation, as in the DIMACS format.
+
+The solver is DPLL with unit propagation over two watched literals per
+clause, first-UIP clause learning with non-chronological backjumping,
+VSIDS variable activities, phase saving and Luby restarts. It can solve
+under assumptions, so one set of clauses answers many queries.
+"""
+
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+def luby(i):
+    """Returns the i-th term (from 1) of the Luby sequence 1 1 2 1 1 2 4..."""
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class Solver():
+    """
+    CDCL SAT solver over clauses of integer literals.
+    """
+
+    # Conflicts between restarts, times the Luby sequence
+    RESTART_BASE = 64
+    ACTIVITY_DECAY = 0.95
+
+    def __init__(self):
+        self.count = 0
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.watches = {}
+        self.clauses = []
+        self.learned = []
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.order = []
+        self.increment = 1.0
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+    def new_variable(self):
+        """Returns a fresh variable."""
+        self.count += 1
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        self.watches[self.count] = []
+        self.watches[-self.count] = []
+        heapq.heappush(self.order, (0.0, self.count))
+        return self.count
+
+    def value(self, literal):
+        """Returns the truth value of literal, or None if unassigned."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def level(self):
+        return len(self.trail_limits)
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, a disjunction of literals. Returns False if the
+        clauses have become unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value is True or -literal in clause:
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watch(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = self.level()
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal forced by unit clauses. Returns a clause
+        whose literals are all false, or None.
+
+        Each clause watches two of its literals, kept in its first two
+        positions; it only needs to be looked at when one of them
+        becomes false and no other literal can take its place.
+        """
+        values = self.values
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watching = self.watches[false]
+            kept = []
+            for i, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if value is not None and value == (first > 0):
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[abs(literal)]
+                    if value is None or value == (literal > 0):
+                        clause[1], clause[k] = literal, false
+                        self.watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[abs(first)] is not None:
+                        kept.extend(watching[i + 1:])
+                        self.watches[false] = kept
+                        return clause
+                    self.assign(first, clause)
+            self.watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (clause, level): the first-UIP clause learned from a
+        conflict, with its asserting literal first, and the level to
+        backjump to.
+        """
+        learned = [None]
+        seen = set()
+        counter = 0
+        level = self.level()
+        index = len(self.trail) - 1
+        clause = conflict
+        start = 0
+        while True:
+            for literal in clause[start:]:
+                variable = abs(literal)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        counter += 1
+                    else:
+                        learned.append(literal)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reasons[abs(literal)]
+            start = 1
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal assigned last after the asserting one
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v)
+                          for v in range(1, self.count + 1)
+                          if self.values[v] is None]
+            heapq.heapify(self.order)
+        elif self.values[variable] is None:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        if self.level() <= level:
+            return
+        limit = self.trail_limits[level]
+        for literal in self.trail[limit:]:
+            variable = abs(literal)
+            self.values[variable] = None
+            self.reasons[variable] = None
+            self.phases[variable] = literal > 0
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def pick(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if self.values[variable] is None:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses have a model in which every literal
+        in assumptions is true, and stores it in self.model.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        restarts = 1
+        budget = self.RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if self.level() == 0:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watch(learned)
+                    self.learned.append(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= self.ACTIVITY_DECAY
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                budget = self.RESTART_BASE * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are the first decisions
+            if self.level() < len(assumptions):
+                literal = assumptions[self.level()]
+                value = self.value(literal)
+                if value is False:
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value is None:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.pick()
+            if variable is None:
+                self.model = list(self.values)
+                return True
+            self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.assign(variable if self.phases[variable] else -variable,
+                        None)
+
+    def stats(self):
+        return {
+            "variables": self.count,
+            "clauses": len(self.clauses),
+            "learned": len(self.learned),
+            "conflicts": self.conflicts,
+            "decisions": self.decisions,
+            "propagations": self.propagations,
+        }
+
+
+class Encoder():
+    """
+    Tseitin encoding of sentences into the clauses of a Solver.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver or Solver()
+        self.variables = {}
+        self.literals = {}
+        self.true = None
+
+    def variable(self, name):
+        """Returns the variable of the symbol called name."""
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_variable()
+        return self.variables[name]
+
+    def constant(self, value):
+        """Returns a literal that is always value."""
+        if self.true is None:
+            self.true = self.solver.new_variable()
+            self.solver.add_clause([self.true])
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to sentence, adding the clauses
+        that define it the first time the sentence is seen. Sentences
+        are interned first, so equal subformulas share one variable and
+        are looked up in constant time.
+        """
+        sentence = sentence.intern()
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        add = self.solver.add_clause
+        if isinstance(sentence, (And, Or)):
+            operands = (sentence.conjuncts if isinstance(sentence, And)
+                        else sentence.disjuncts)
+            if not operands:
+                return self.constant(isinstance(sentence, And))
+            if len(operands) == 1:
+                return self.literal(operands[0])
+            parts = [self.literal(operand) for operand in operands]
+            # For Or, encode the equivalent ¬(¬x1 ∧ ... ∧ ¬xk)
+            sign = 1 if isinstance(sentence, And) else -1
+            gate = self.solver.new_variable()
+            for part in parts:
+                add([-gate, sign * part])
+            add([gate] + [-sign * part for part in parts])
+            literal = sign * gate
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            gate = self.solver.new_variable()
+            add([-gate, -antecedent, consequent])
+            add([gate, antecedent])
+            add([gate, -consequent])
+            literal = gate
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            gate = self.solver.new_variable()
+            add([-gate, -left, right])
+            add([-gate, left, -right])
+            add([gate, left, right])
+            add([gate, -left, -right])
+            literal = gate
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+        self.literals[sentence] = literal
+        return literal
+
+    def add(self, sentence):
+        """
+        Asserts sentence. Conjunctions and disjunctions at the top are
+        added as clauses directly rather than through a new variable.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause([self.literal(disjunct)
+                                    for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.solver.add_clause([-self.literal(sentence.antecedent),
+                                    self.literal(sentence.consequent)])
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def model(self):
+        """
+        Returns the last model found, as a dict mapping every symbol
+        name to its truth value, or None.
+        """
+        if self.solver.model is None:
+            return None
+        return {name: bool(self.solver.model[variable])
+                for name, variable in self.variables.items()}
+
+
+def satisfiable(sentence):
+    """Returns a model of sentence as a dict, or None if it has none."""
+    encoder = Encoder()
+    encoder.add(sentence)
+    if not encoder.solver.solve():
+        return None
+    return encoder.model()
+
+
+def entails(knowledge, query):
+    """
+    Returns True if knowledge entails query, that is, if knowledge and
+    the negation of query cannot both be true.
+    """
+    encoder = Encoder()
+    encoder.add(knowledge)
+    encoder.add(Not(query))
+    return not encoder.solver.solve()
@@ -0,0 +1,43 @@
+"""
+Tests for compiling deeply nested sentences.
+
+Run with: python -m unittest test_logic
+"""
+
+import unittest
+
+from logic import And, Not, Symbol, compile_sentence, model_check
+
+A = Symbol("A")
+B = Symbol("B")
+
+
+def nested(depth):
+    """Returns Not(And(...Not(And(A, B))..., B)), depth levels deep."""
+    sentence = A
+    for _ in range(depth):
+        sentence = Not(And(sentence, B))
+    return sentence
+
+
+class DeepSentenceTest(unittest.TestCase):
+
+    def test_compiled_matches_recursive(self):
+        sentence = nested(200)
+        for knowledge, query in [(And(A, B, sentence), A),
+                                 (sentence, A),
+                                 (And(B, sentence), Not(A))]:
+            self.assertEqual(model_check(knowledge, query, "compiled"),
+                             model_check(knowledge, query))
+
+    def test_compile_deeper_than_recursion_limit(self):
+        sentence = A
+        for _ in range(20000):
+            sentence = Not(sentence)
+        evaluate = compile_sentence(sentence, ["A"])
+        self.assertTrue(evaluate((True,)))
+        self.assertFalse(evaluate((False,)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Counts the positions visited by plain minimax and by alpha-beta search
+(see tictactoe.Search) in solving every reachable position of the game,
+and checks that they agree on its value.
+
+Each position is solved by a fresh search, without a transposition
+table and then with one, and plain minimax visits the whole game tree
+below it.
+
+Usage: python benchmark.py
+"""
+
+import time
+
+from tictactoe import FULL, Search, has_line, reachable_positions
+
+
+def plain_minimax(x, o, counter):
+    """
+    Returns the value of the position by searching every move, counting
+    the positions visited in counter[0].
+    """
+    counter[0] += 1
+    if has_line(x):
+        return 1
+    if has_line(o):
+        return -1
+    if x | o == FULL:
+        return 0
+    x_turn = bin(x).count("1") == bin(o).count("1")
+    values = []
+    for cell in range(9):
+        bit = 1 << cell
+        if not (x | o) & bit:
+            values.append(plain_minimax(x | bit, o, counter) if x_turn
+                          else plain_minimax(x, o | bit, counter))
+    return max(values) if x_turn else min(values)
+
+
+def alpha_beta(x, o, table):
+    """Returns (value, positions visited) for a fresh Search."""
+    search = Search(table)
+    x_turn = bin(x).count("1") == bin(o).count("1")
+    if x_turn:
+        value, _ = search.max_value(x, o)
+    else:
+        value, _ = search.min_value(x, o)
+    return value, search.nodes
+
+
+def main():
+    positions = reachable_positions()
+    print(f"{len(positions)} positions to move in")
+
+    results = {}
+    for name in ("minimax", "alpha-beta", "alpha-beta + table"):
+        start = time.perf_counter()
+        total = 0
+        values = []
+        for x, o in positions:
+            if name == "minimax":
+                counter = [0]
+                value = plain_minimax(x, o, counter)
+                nodes = counter[0]
+            else:
+                value, nodes = alpha_beta(
+                    x, o, {} if name.endswith("table") else None
+                )
+            total += nodes
+            values.append(value)
+        seconds = time.perf_counter() - start
+        results[name] = values
+        note = "" if values == results["minimax"] else "  MISMATCH"
+        print(f"    {name:20} {total:12} nodes {seconds * 1000:10.1f} ms"
+              f"{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Builds the book that minimax answers from: the value and a best move
+of every reachable position, solved once here instead of at every move.
+
+The book is book.bin, with one byte for each of the 3 ** 9 ways to fill
+the board, at the position's index (see tictactoe.position_index).
+Boards that cannot be reached, or on which the game is over, have
+NO_ENTRY.
+
+Usage: python book.py
+"""
+
+import time
+
+from tictactoe import (BOOK_FILE, NO_ENTRY, Search, position_index,
+                       reachable_positions)
+
+
+def build_book():
+    """
+    Returns the book as bytes.
+    """
+    book = bytearray([NO_ENTRY]) * 3 ** 9
+    search = Search({})
+    for x, o in reachable_positions():
+        if bin(x).count("1") == bin(o).count("1"):
+            value, cell = search.max_value(x, o)
+        else:
+            value, cell = search.min_value(x, o)
+        book[position_index(x, o)] = (value + 1) << 4 | cell
+    return bytes(book)
+
+
+def main():
+    start = time.perf_counter()
+    book = build_book()
+    with open(BOOK_FILE, "wb") as f:
+        f.write(book)
+    entries = sum(entry != NO_ENTRY for entry in book)
+    print(f"Wrote {entries} positions to {BOOK_FILE} "
+          f"in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,78 @@
 Tic Tac Toe Player
 """
 
-import copy
-import math
-import sys
+import os
 
 X = "X"
 O = "O"
 EMPTY = None
-optimal_action = []
+
+WINNING_STATES = [((0, 0), (0, 1), (0, 2)),
+                  ((1, 0), (1, 1), (1, 2)),
+                  ((2, 0), (2, 1), (2, 2)),
+                  ((0, 0), (1, 0), (2, 0)),
+                  ((0, 1), (1, 1), (2, 1)),
+                  ((0, 2), (1, 2), (2, 2)),
+                  ((0, 0), (1, 1), (2, 2)),
+                  ((0, 2), (1, 1), (2, 0))]
+
+# Bitboards: cell (i, j) is bit 3 * i + j of a 9-bit mask, one mask for
+# the cells of X and one for the cells of O
+FULL = (1 << 9) - 1
+WIN_MASKS = [sum(1 << (3 * i + j) for i, j in line) for line in WINNING_STATES]
+
+
+def symmetries():
+    """
+    Returns the 8 symmetries of the board (rotations and reflections),
+    each as a list mapping every cell's bit index to its image.
+    """
+    result = []
+    for turns in range(4):
+        for reflect in (False, True):
+            images = []
+            for cell in range(9):
+                i, j = divmod(cell, 3)
+                for _ in range(turns):
+                    i, j = j, 2 - i
+                if reflect:
+                    j = 2 - j
+                images.append(3 * i + j)
+            result.append(images)
+    return result
+
+
+def transform_table(images):
+    """
+    Returns the image of each of the 512 masks under a symmetry, each
+    built from the image of the mask without its lowest cell.
+    """
+    table = [0] * (1 << 9)
+    for mask in range(1, 1 << 9):
+        rest = mask & (mask - 1)
+        cell = (mask ^ rest).bit_length() - 1
+        table[mask] = table[rest] | (1 << images[cell])
+    return table
+
+
+# For every symmetry, the image of each of the 512 masks
+TRANSFORMS = [transform_table(images) for images in symmetries()]
+
+# For every mask, its cells as a base-3 number with digits 0 and 1, so
+# that TERNARY[x] + 2 * TERNARY[o] numbers every board from 0 to 3 ** 9
+TERNARY = [sum(3 ** cell for cell in range(9) if mask >> cell & 1)
+           for mask in range(1 << 9)]
+
+# The book: for every board, by position_index, one byte with the value
+# of the board plus one in its high four bits and the cell of the best
+# move in its low four bits, or NO_ENTRY (see book.py)
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "book.bin")
+NO_ENTRY = 0xFF
+
+# Minimax values or bounds of positions searched so far, by canonical
+# position
+transposition_table = {}
 
 
 def initial_state():
@@ -24,14 +88,7 @@ def winning_states():
     """
     Returns possible winning states
     """
-    return [((0, 0),(0, 1),(0, 2)),
-            ((1, 0),(1, 1),(1, 2)),
-            ((2, 0),(2, 1),(2, 2)),
-            ((0, 0),(1, 0),(2, 0)),
-            ((0, 1),(1, 1),(2, 1)),
-            ((0, 2),(1, 2),(2, 2)),
-            ((0, 0),(1, 1),(2, 2)),
-            ((0, 2),(1, 1),(2, 0))]
+    return WINNING_STATES
 
 def player(board):
     """
@@ -67,12 +124,13 @@ def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    new_board = copy.deepcopy(board)
     try:
-        if (action not in actions(board)):
+        i, j = action
+        if not (0 <= i < 3 and 0 <= j < 3) or board[i][j] != EMPTY:
             raise ValueError("Invalid move.")
         else:
-            new_board[action[0]][action[1]] = player(board)
+            new_board = [list(row) for row in board]
+            new_board[i][j] = player(board)
             return new_board
     except ValueError as e:
         print(f"Error: {e}. Please try again.")
@@ -83,18 +141,11 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    winner_found = None
-
-    for i in range(len(winning_states())):  # Row index
-        if (((board[(winning_states()[i][0])[0]][(winning_states()[i][0])[1]]))
-            == (board[(winning_states()[i][1])[0]][(winning_states()[i][1])[1]]) and
-            ((board[(winning_states()[i][1])[0]][(winning_states()[i][1])[1]]))
-            == (board[(winning_states()[i][2])[0]][(winning_states()[i][2])[1]]) and
-            ((board[(winning_states()[i][0])[0]][(winning_states()[i][0])[1]])) != EMPTY):
-            winner_found = board[(winning_states()[i][0])[0]][(winning_states()[i][0])[1]]
-            break            
-            
-    return winner_found
+    for (a, b, c) in WINNING_STATES:
+        mark = board[a[0]][a[1]]
+        if mark != EMPTY and mark == board[b[0]][b[1]] == board[c[0]][c[1]]:
+            return mark
+    return None
 
 
 def terminal(board):
@@ -119,54 +170,227 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def bitboard(board):
     """
-    Returns the optimal action for the current player on the board.
+    Returns the board as a pair of bitboards (x, o).
     """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
 
-    if (player(board) == X):
-        max_value(board)
-    if (player(board) == O):
-        min_value(board)        
 
-    print(len(optimal_action))
-    if (len(optimal_action) > 0):
-        return optimal_action[0]
-    else:
-        return None
+def has_line(mask):
+    """
+    Returns True if the cells in mask complete a winning line.
+    """
+    for win in WIN_MASKS:
+        if mask & win == win:
+            return True
+    return False
 
 
-def max_value(board):
+def position_index(x, o):
+    """
+    Returns the number of the position in the book.
+    """
+    return TERNARY[x] + 2 * TERNARY[o]
 
-    v = -sys.maxsize - 1 # defining a minus infinity representation
 
-    if terminal(board):
-        return utility(board)
-    
-    for action in actions(board):
-        vv = v
-        v = max(v, min_value(result(board, action)))
-        if (v > vv):
-            optimal_action.clear()
-            optimal_action.insert(0,action)
+def reachable_positions():
+    """
+    Returns every position reachable from the empty board that is not
+    over yet, as (x, o) bitboards.
+    """
+    positions = set()
+    frontier = [(0, 0)]
+    while frontier:
+        x, o = frontier.pop()
+        if (x, o) in positions or has_line(x) or has_line(o) \
+                or x | o == FULL:
+            continue
+        positions.add((x, o))
+        x_turn = bin(x).count("1") == bin(o).count("1")
+        for cell in range(9):
+            bit = 1 << cell
+            if not (x | o) & bit:
+                frontier.append((x | bit, o) if x_turn else (x, o | bit))
+    return sorted(positions)
+
+
+def load_book():
+    """
+    Returns the book as bytes, or None if it has not been built.
+    """
+    try:
+        with open(BOOK_FILE, "rb") as f:
+            book = f.read()
+    except FileNotFoundError:
+        return None
+    if len(book) != 3 ** 9:
+        return None
+    return book
 
-    return v
 
-def min_value(board):
+def canonical(x, o):
+    """
+    Returns one integer for the position and all its symmetric images:
+    the smallest encoding of the 8 of them.
+    """
+    return min((transform[x] << 9) | transform[o] for transform in TRANSFORMS)
+
+
+class Search():
+    """
+    Alpha-beta search over bitboards, X maximizing and O minimizing.
+
+    Values are 1 if X wins with perfect play, -1 if O does and 0 for a
+    tie. Since no value lies outside [-1, 1], the search starts with
+    that window, and a player stops looking at moves as soon as one
+    wins: no other can be better.
+
+    Moves are tried center first, then corners, then edges, except that
+    the move that last caused a cutoff at the same depth (the killer
+    move) comes first and moves that caused many cutoffs anywhere (by
+    history) before the others. If table is a dict, it is used as a
+    transposition table of values and bounds, by canonical position.
+    """
+
+    # Cells by static preference: center, corners, edges
+    ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+    # Kinds of transposition table entries
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, table=None):
+        self.table = table
+        self.killers = [None] * 10
+        self.history = [0] * 9
+        self.nodes = 0
+
+    def moves(self, x, o, ply):
+        """
+        Returns the free cells of the position, best candidates first.
+        """
+        free = [cell for cell in self.ORDER if not (x | o) >> cell & 1]
+        killer = self.killers[ply]
+        free.sort(key=lambda cell: (cell != killer, -self.history[cell]))
+        return free
+
+    def cutoff(self, cell, ply):
+        self.killers[ply] = cell
+        self.history[cell] += (10 - ply) ** 2
+
+    def lookup(self, key, alpha, beta):
+        """
+        Returns (value, alpha, beta): the value if the transposition
+        table decides the position within the window, or None and the
+        window narrowed by the bound stored for it.
+        """
+        entry = self.table.get(key)
+        if entry is None:
+            return None, alpha, beta
+        value, kind = entry
+        if kind == self.EXACT:
+            return value, alpha, beta
+        if kind == self.LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, alpha, beta
+        return None, alpha, beta
+
+    def store(self, key, value, alpha, beta):
+        if value <= alpha:
+            self.table[key] = (value, self.UPPER)
+        elif value >= beta:
+            self.table[key] = (value, self.LOWER)
+        else:
+            self.table[key] = (value, self.EXACT)
+
+    def max_value(self, x, o, alpha=-1, beta=1, ply=0):
+        """
+        Returns (value, cell) for X to move: the value of the position
+        if it lies within (alpha, beta), or else a bound beyond the
+        window, and the cell of the move that gives it.
+        """
+        return self.value(x, o, alpha, beta, ply, True)
+
+    def min_value(self, x, o, alpha=-1, beta=1, ply=0):
+        """
+        Returns (value, cell) for O to move, like max_value.
+        """
+        return self.value(x, o, alpha, beta, ply, False)
+
+    def value(self, x, o, alpha, beta, ply, x_turn):
+        self.nodes += 1
+        if has_line(o if x_turn else x):
+            return (-1 if x_turn else 1), None
+        if x | o == FULL:
+            return 0, None
+
+        # The moves of the root are always searched, to find the best one
+        key = None
+        if self.table is not None:
+            key = canonical(x, o)
+            if ply > 0:
+                value, alpha, beta = self.lookup(key, alpha, beta)
+                if value is not None:
+                    return value, None
+        window = (alpha, beta)
+
+        best, best_cell = None, None
+        for cell in self.moves(x, o, ply):
+            bit = 1 << cell
+            if x_turn:
+                value, _ = self.min_value(x | bit, o, alpha, beta, ply + 1)
+                if best is None or value > best:
+                    best, best_cell = value, cell
+                alpha = max(alpha, value)
+            else:
+                value, _ = self.max_value(x, o | bit, alpha, beta, ply + 1)
+                if best is None or value < best:
+                    best, best_cell = value, cell
+                beta = min(beta, value)
+            if alpha >= beta:
+                self.cutoff(cell, ply)
+                break
+
+        if key is not None:
+            self.store(key, best, *window)
+        return best, best_cell
+
+
+# Shared by every call to minimax, so positions solved once stay solved
+search = Search(transposition_table)
+
+book = load_book()
 
-    v = sys.maxsize # defining an infinity representation
 
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
     if terminal(board):
-        return utility(board)
-    
-    for action in actions(board):
-        vv = v
-        v = min(v, max_value(result(board, action)))
-        if (v < vv):
-            optimal_action.clear()
-            optimal_action.insert(0,action)
-
-    return v
+        return None
+    x, o = bitboard(board)
+
+    # Look the move up in the book, or search if it is not there
+    if book is not None:
+        entry = book[position_index(x, o)]
+        if entry != NO_ENTRY:
+            return divmod(entry & 0x0F, 3)
+
+    if player(board) == X:
+        _, cell = search.max_value(x, o)
+    else:
+        _, cell = search.min_value(x, o)
+    return divmod(cell, 3)
 
 
 def main():
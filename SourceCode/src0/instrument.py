@@ -0,0 +1,112 @@
+"""
+Instrumentation for search loops.
+
+A search that is given a SearchStats reports every expansion to it and
+calls its neighbor function through it. Searches that are not given one
+skip all of this, so disabled instrumentation costs one `is None` test
+per expanded node. A SearchStats can also cap the number of nodes a
+search may expand and the time it may take.
+
+Projects/degrees/instrument.py and SourceCode/src0/instrument.py are
+identical copies, so that each directory runs on its own: keep them in
+sync, changing both together.
+"""
+
+import json
+import time
+
+
+class SearchLimitExceeded(Exception):
+    """Raised when a search expands more nodes than its SearchStats allows."""
+
+
+class SearchTimedOut(SearchLimitExceeded):
+    """Raised when a search is still running at its SearchStats deadline."""
+
+
+class SearchStats():
+    """
+    Counters for one or more searches: nodes expanded, peak frontier
+    size, time spent generating neighbors and total wall time.
+
+    If trace is a writable text file, each search also writes JSON
+    trace events to it, one per line: a start event, an expand event per
+    node and an end event with the counters.
+
+    If max_expanded is set, each search raises SearchLimitExceeded once
+    it expands more than that many nodes. If deadline is set, a time.time()
+    value, searches raise SearchTimedOut once it has passed; as it is
+    wall-clock time, it can be set in one process for a search in another.
+    """
+
+    def __init__(self, trace=None, max_expanded=None, deadline=None):
+        self.trace = trace
+        self.max_expanded = max_expanded
+        self.deadline = deadline
+        self.limit = None
+        self.searches = 0
+        self.expanded = 0
+        self.peak_frontier = 0
+        self.neighbor_time = 0.0
+        self.wall_time = 0.0
+        self.started = None
+
+    def event(self, name, **fields):
+        if self.trace is not None:
+            fields = {"event": name, "time": time.perf_counter(), **fields}
+            self.trace.write(json.dumps(fields, default=str) + "\n")
+
+    def start(self, search, **fields):
+        self.searches += 1
+        self.started = time.perf_counter()
+        if self.max_expanded is not None:
+            self.limit = self.expanded + self.max_expanded
+        self.check_deadline()
+        self.event("start", search=search, **fields)
+
+    def stop(self, **fields):
+        self.wall_time += time.perf_counter() - self.started
+        self.started = None
+        self.event("end", **fields, **self.as_dict())
+
+    def expand(self, state, frontier_size):
+        """Records the expansion of state with frontier_size still queued."""
+        self.expanded += 1
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+        if self.trace is not None:
+            self.event("expand", state=state, frontier=frontier_size)
+        if self.limit is not None and self.expanded > self.limit:
+            raise SearchLimitExceeded(
+                f"search expanded more than {self.max_expanded} nodes"
+            )
+        if self.deadline is not None:
+            self.check_deadline()
+
+    def check_deadline(self):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimedOut("search ran past its deadline")
+
+    def timed(self, neighbors):
+        """Returns neighbors wrapped to add its running time to the stats."""
+        def timed_neighbors(state):
+            start = time.perf_counter()
+            result = neighbors(state)
+            self.neighbor_time += time.perf_counter() - start
+            return result
+        return timed_neighbors
+
+    def as_dict(self):
+        return {
+            "searches": self.searches,
+            "expanded": self.expanded,
+            "peak_frontier": self.peak_frontier,
+            "neighbor_time": self.neighbor_time,
+            "wall_time": self.wall_time,
+        }
+
+    def __repr__(self):
+        return (f"SearchStats(expanded={self.expanded}, "
+                f"peak_frontier={self.peak_frontier}, "
+                f"neighbor_time={self.neighbor_time:.6f}, "
+                f"wall_time={self.wall_time:.6f})")
@@ -1,5 +1,7 @@
 import sys
 
+from instrument import SearchStats
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -116,8 +118,23 @@ class Maze():
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def solve(self, stats=None):
+        """
+        Finds a solution to maze, if one exists.
+        If stats is a SearchStats, the search reports to it.
+        """
+        if stats is not None:
+            stats.start("maze", start=self.start, goal=self.goal)
+            neighbors = stats.timed(self.neighbors)
+        else:
+            neighbors = self.neighbors
+        try:
+            self.search(neighbors, stats)
+        finally:
+            if stats is not None:
+                stats.stop()
+
+    def search(self, neighbors, stats):
 
         # Keep track of number of states explored
         self.num_explored = 0
@@ -140,6 +157,8 @@ class Maze():
             # Choose a node from the frontier
             node = frontier.remove()
             self.num_explored += 1
+            if stats is not None:
+                stats.expand(node.state, len(frontier.frontier))
 
             # If node is the goal, then we have a solution
             if node.state == self.goal:
@@ -158,7 +177,7 @@ class Maze():
             self.explored.add(node.state)
 
             # Add neighbors to frontier
-            for action, state in self.neighbors(node.state):
+            for action, state in neighbors(node.state):
                 if not frontier.contains_state(state) and state not in self.explored:
                     child = Node(state=state, parent=node, action=action)
                     frontier.add(child)
@@ -222,8 +241,10 @@ m = Maze(sys.argv[1])
 print("Maze:")
 m.print()
 print("Solving...")
-m.solve()
+stats = SearchStats()
+m.solve(stats)
 print("States Explored:", m.num_explored)
+print(stats)
 print("Solution:")
 m.print()
 m.output_image("maze.png", show_explored=True)